@@ -1,48 +1,111 @@
-from flask import Flask, request, jsonify, Response, send_file
+from flask import Flask, request, jsonify, Response, send_file, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import os
-import json
+import io
+import orjson
 import logging
+import hashlib
+import threading
+import queue
+import atexit
+import functools
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 import google.generativeai as genai
-from dotenv import load_dotenv
+from cachetools import TTLCache
 from config import Config
-from utils import parse_gemini_response, validate_symptoms, setup_logging, log_gemini_response, log_debug
-from middleware import rate_limit, add_security_headers, validate_request_data
-from auth import require_auth, optional_auth, get_current_user_id, is_authenticated
+from utils import parse_gemini_response, validate_symptoms, setup_logging, log_gemini_response, log_debug, is_debug_logging_enabled
+from middleware import rate_limit, limit_concurrent_analyses, add_security_headers, compress_response, validate_request_data, TokenBucketLimiter
+from auth import require_auth, optional_auth, get_current_user_id, start_jwks_refresh
 import re
+import random
+import string
 import time
-import uuid
-import socket
 import traceback
-from collections import defaultdict, Counter
-from pdf_generator import generate_overview_pdf, generate_details_pdf
 import tempfile
-import shutil
 from werkzeug.utils import secure_filename
-from datetime import datetime
 
-# Configure logging - reduce verbosity
-logging.basicConfig(level=logging.INFO, 
-                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                   handlers=[logging.FileHandler("api.log", encoding='utf-8'), logging.StreamHandler()])
+# Root handlers are configured by setup_logging() in start_background_services()
 logger = logging.getLogger(__name__)
 
 # Configure input logging - separate file for user inputs
-input_logger = logging.getLogger("input_logger")
-input_logger.setLevel(logging.INFO)
 # Use an absolute path for the input log file
 current_dir = os.path.dirname(os.path.abspath(__file__))
+
 input_log_path = os.path.join(current_dir, "input.log")
-input_file_handler = logging.FileHandler(input_log_path, encoding='utf-8')
-input_file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-input_file_handler.setFormatter(input_file_formatter)
-input_logger.addHandler(input_file_handler)
-# Ensure input logger doesn't propagate to root logger
-input_logger.propagate = False
+
+# User input entries are queued as encoded JSON lines and written in batches by a background thread
+INPUT_LOG_QUEUE_SIZE = 10000
+INPUT_LOG_BATCH_SIZE = 256
+INPUT_LOG_IDLE_WAIT = 0.05  # seconds to wait for more entries before writing
+INPUT_LOG_MAX_WAIT = 0.1  # upper bound on how long a batch is held back
+input_log_queue = queue.Queue(maxsize=INPUT_LOG_QUEUE_SIZE)
+
+def _write_input_log_batch(fd, lines):
+    """Append encoded log lines with a single vectored write where the platform supports it"""
+    if hasattr(os, "writev"):
+        written = os.writev(fd, lines)
+        if written == sum(map(len, lines)):
+            return
+        data = b"".join(lines)[written:]
+    else:
+        data = b"".join(lines)
+    while data:
+        data = data[os.write(fd, data):]
+
+def _input_log_writer():
+    """Drain queued input log lines and append them to the input log in batches"""
+    # O_APPEND keeps each batch contiguous even when several workers share the file
+    fd = os.open(input_log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        while True:
+            line = input_log_queue.get()
+            if line is None:
+                return
+            lines = [line]
+            deadline = time.monotonic() + INPUT_LOG_MAX_WAIT
+            stop = False
+            while len(lines) < INPUT_LOG_BATCH_SIZE:
+                timeout = min(INPUT_LOG_IDLE_WAIT, deadline - time.monotonic())
+                if timeout <= 0:
+                    break
+                try:
+                    line = input_log_queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if line is None:
+                    stop = True
+                    break
+                lines.append(line)
+            try:
+                _write_input_log_batch(fd, lines)
+            except Exception as e:
+                logger.error("Failed to write input log batch: %s", e)
+            if stop:
+                return
+    finally:
+        os.close(fd)
+
+# Started by start_background_services() in the server process only
+input_log_thread = threading.Thread(target=_input_log_writer, name="input-log-writer", daemon=True)
+
+def _stop_input_log_writer():
+    """Flush pending input log entries on interpreter shutdown"""
+    try:
+        input_log_queue.put(None, timeout=1)
+    except queue.Full:
+        return
+    input_log_thread.join(timeout=2)
+
+@functools.lru_cache(maxsize=1)
+def format_log_timestamp(second):
+    """Format a whole-second epoch time once, however many entries share it"""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
 
 def log_user_input(route, data, ip=None, user_id=None):
     """Log user input data with timestamp and route information"""
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    timestamp = format_log_timestamp(int(time.time()))
     # Sanitize the data to remove any sensitive information
     sanitized_data = sanitize_data_for_logging(data)
     log_entry = {
@@ -52,12 +115,11 @@ def log_user_input(route, data, ip=None, user_id=None):
         "user_id": user_id,
         "data": sanitized_data
     }
-    # Use a direct file write approach in addition to the logger
-    with open(input_log_path, "a", encoding='utf-8') as f:
-        f.write(json.dumps(log_entry) + "\n")
-        f.flush()
-    # Also log using the logger
-    input_logger.info(json.dumps(log_entry))
+    # Serialize now so later changes to the request data don't leak into the log
+    try:
+        input_log_queue.put_nowait(orjson.dumps(log_entry, default=str, option=orjson.OPT_APPEND_NEWLINE))
+    except queue.Full:
+        logger.warning("Input log queue is full, dropping entry")
 
 def sanitize_data_for_logging(data):
     """Remove or mask any sensitive data before logging"""
@@ -72,54 +134,78 @@ def sanitize_data_for_logging(data):
     
     return sanitized
 
+# Salt added to IP hashes for security
+IP_HASH_SALT = b"healthvitals-salt"
+
+# Bounded so repeat clients skip rehashing without keeping every address seen
+@functools.lru_cache(maxsize=50_000)
 def hash_ip(ip):
     """Create a hash of the IP address for privacy"""
-    import hashlib
     if not ip:
         return "unknown"
-    # Add a salt to the hash for security
-    salt = "healthvitals-salt"
-    return hashlib.sha256((salt + ip).encode()).hexdigest()[:16]
+    # 8-byte BLAKE2b digest gives the same 16 hex chars without truncating a longer hash
+    return hashlib.blake2b(IP_HASH_SALT + ip.encode(), digest_size=8).hexdigest()
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson for faster request and response handling"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
 
-# Load environment variables
-load_dotenv()
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Serialize straight to bytes instead of building a str for Response to re-encode
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
 
 app = Flask(__name__)
-# Configure CORS to allow Authorization header and credentials
+app.json = OrjsonProvider(app)
+app.config['MAX_CONTENT_LENGTH'] = Config.MAX_CONTENT_LENGTH
+# Configure CORS to allow Authorization header from any origin (auth uses bearer tokens, not cookies)
 CORS(app, 
-     origins=["https://healthvitals-ai-43006.web.app/"], 
-     supports_credentials=True, 
+     origins="*", 
      allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
-      methods=["GET", "POST", "PUT", "DELETE"])  
-
-setup_logging()
+     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])  
 
 # Setup Google Gemini API
 api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    logging.error("GEMINI_API_KEY not found in environment variables")
-    print("WARNING: GEMINI_API_KEY not found in environment variables")
-    # Try to manually read from .env file as a fallback
-    try:
-        with open(".env", "r") as f:
-            for line in f:
-                if line.startswith("GEMINI_API_KEY="):
-                    api_key = line.strip().split("=", 1)[1].strip()
-                    print(f"Manually loaded API key from .env file: {api_key[:5]}...")
-                    break
-    except Exception as e:
-        print(f"Failed to manually load API key: {str(e)}")
 
-if api_key:
-    genai.configure(api_key=api_key)
+def start_background_services():
+    """Configure logging, the Gemini client and the background threads for the server process"""
+    setup_logging()
+    
+    if not api_key:
+        logger.error("GEMINI_API_KEY not found in environment variables")
+        # Fail fast outside development instead of returning 500s on every request
+        if not Config.DEBUG:
+            raise RuntimeError("GEMINI_API_KEY must be set in production")
+    
+    # Configure the client once per process so every request reuses the same transport channel
+    if api_key:
+        genai.configure(api_key=api_key, transport=Config.GEMINI_TRANSPORT)
+    
+    input_log_thread.start()
+    atexit.register(_stop_input_log_writer)
+    start_jwks_refresh()
+
+# Spawned PDF pool workers re-import the main script as __mp_main__ under `python app.py`,
+# so only the server process runs the startup side effects
+if __name__ != "__mp_main__":
+    start_background_services()
+
+# Health check body only depends on startup state, so serialize it once
+HEALTH_RESPONSE_BODY = orjson.dumps({"status": "OK", "api_key_present": bool(api_key)})
 
 # Configure safety settings to reduce filtering
-safety_settings = [
+safety_settings = (
     {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
     {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
     {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
     {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-]
+)
 
 # Configure generation settings for Gemini API
 generation_config = {
@@ -129,96 +215,43 @@ generation_config = {
     "max_output_tokens": 4096,
 }
 
-# Track anonymous quick analysis usage by IP
-anonymous_quick_analysis_tracker = {}
-
-def has_used_quick_analysis(ip):
-    """Check if an anonymous user has already used quick analysis"""
-    if ip in anonymous_quick_analysis_tracker:
-        return True
-    return False
-
-@app.after_request
-def after_request(response):
-    # Log only HTTP method and path
-    logger.info(f"{request.method} {request.path} - Status: {response.status_code}")
-    
-    response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,X-Requested-With')
-    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
-    return add_security_headers(response)
+# Model for the full symptom analysis, created once and shared across requests
+analysis_model = genai.GenerativeModel(
+    model_name="gemini-1.5-pro",
+    generation_config=generation_config,
+    safety_settings=safety_settings
+)
 
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    status = {
-        "status": "OK",
-        "api_key_present": bool(api_key)
-    }
-    return jsonify(status)
+# Model for quick analyses. The reply is a few condition names, one paragraph and one
+# word, so the faster flash model and a small output budget are enough.
+quick_analysis_model = genai.GenerativeModel(
+    model_name="gemini-1.5-flash",
+    generation_config={
+        "temperature": 0.4,
+        "top_p": 0.95,
+        "top_k": 40,
+        "max_output_tokens": 256,
+    },
+    safety_settings=safety_settings
+)
 
-@app.route('/api/analyze-symptoms', methods=['POST'])
-@rate_limit
-@validate_request_data
-@require_auth
-def analyze_symptoms():
-    try:
-        logger.info(f"POST /api/analyze-symptoms - Processing request")
-        data = request.get_json()
-        
-        # Log user input with user ID
-        log_user_input("/api/analyze-symptoms", data, request.remote_addr, user_id=request.user_id)
-        
-        # Only log minimal information, not the entire request
-        symptoms = data.get('symptoms', [])
-        age = data.get('age', '')
-        gender = data.get('gender', '')
-        height = data.get('height', '')
-        weight = data.get('weight', '')
-        medical_history = data.get('medicalHistory', [])
-        medical_history_text = data.get('medicalHistoryText', '')
-        
-        # Get lifestyle factors
-        exercise_frequency = data.get('exerciseFrequency', 'moderate')
-        sleep_quality = data.get('sleepQuality', 'fair')
-        stress_level = data.get('stressLevel', 'moderate')
-        
-        logger.info(f"Analyzing {len(symptoms)} symptoms with lifestyle factors")
-        
-        # Convert severity to integers if they are strings
-        for symptom in symptoms:
-            if 'severity' in symptom and isinstance(symptom['severity'], str):
-                try:
-                    symptom['severity'] = int(symptom['severity'])
-                except (ValueError, TypeError):
-                    symptom['severity'] = 5  # Default to medium severity
+# Medical report analyses need more deterministic output and room for a detailed JSON response
+report_analysis_model = genai.GenerativeModel(
+    model_name="gemini-1.5-pro",
+    generation_config={
+        "temperature": 0.3,  # Lower temperature for more deterministic results
+        "top_p": 0.95,
+        "top_k": 40,
+        "max_output_tokens": 8192,  # Increased max tokens for more detailed analysis
+    },
+    safety_settings=safety_settings
+)
 
-        # Validate symptoms data
-        validation_result = validate_symptoms(symptoms)
-        if not validation_result['valid']:
-            logger.error(f"Symptom validation failed: {validation_result['message']}")
-            return jsonify({"error": validation_result['message']}), 400
+# Placeholder for optional patient details that were left blank
+NONE_REPORTED = "None reported"
 
-        if not api_key:
-            logger.error("Cannot process request: GEMINI_API_KEY not configured")
-            return jsonify({
-                "error": "API key not configured",
-                "recommendation": "Please check server configuration"
-            }), 500
-        
-        # Format symptoms for the prompt
-        formatted_symptoms = "\n".join([f"- {s['name']} (Severity: {s['severity']}/10, Duration: {s['duration']})" for s in symptoms])
-        formatted_medical_history = "\n".join([f"- {condition}" for condition in medical_history]) if medical_history else "None"
-        
-        # Get additional details from the request
-        diet_preference = data.get('dietPreference', 'balanced')
-        current_medications = data.get('currentMedications', '')
-        allergies = data.get('allergies', '')
-        recent_life_changes = data.get('recentLifeChanges', '')
-        
-        logger.info(f"Calling Gemini API for analysis")
-        
-        # Create the prompt for Gemini
-        prompt = f"""
+# Prompt for the full symptom analysis, filled in per request by render_analysis_prompt
+ANALYSIS_PROMPT_TEMPLATE = """
         Analyze the following symptoms as a medical AI assistant. Provide a comprehensive medical analysis based on the symptoms, age, gender, height, weight, medical history, lifestyle factors, and additional details provided.
 
         PATIENT INFORMATION:
@@ -240,9 +273,9 @@ def analyze_symptoms():
         Stress Level: {stress_level}
         
         Diet Preference: {diet_preference}
-        Current Medications: {current_medications if current_medications else "None reported"}
-        Allergies: {allergies if allergies else "None reported"}
-        Recent Life Changes: {recent_life_changes if recent_life_changes else "None reported"}
+        Current Medications: {reported_medications}
+        Allergies: {reported_allergies}
+        Recent Life Changes: {reported_life_changes}
         
         Please provide a comprehensive analysis with EACH section clearly separated by its own heading. 
         Use the EXACT section headings below - do not combine or merge sections:
@@ -399,71 +432,406 @@ def analyze_symptoms():
         10. For each condition, include condition-specific recommended actions and preventive measures.
         """
 
+# Split the template into (literal, field) pairs once so each request only joins strings
+ANALYSIS_PROMPT_PARTS = tuple(
+    (literal, field) for literal, field, _, _ in string.Formatter().parse(ANALYSIS_PROMPT_TEMPLATE)
+)
+
+def render_prompt(prompt_parts, prompt_context):
+    """Fill a template split by string.Formatter().parse, equivalent to template.format(**prompt_context)"""
+    return "".join([
+        piece
+        for literal, field in prompt_parts
+        for piece in (literal, str(prompt_context[field]) if field is not None else "")
+    ])
+
+def render_analysis_prompt(prompt_context):
+    """Fill the analysis prompt, equivalent to ANALYSIS_PROMPT_TEMPLATE.format(**prompt_context)"""
+    return render_prompt(ANALYSIS_PROMPT_PARTS, prompt_context)
+
+# Fields shared by every fallback analysis returned when Gemini cannot be used
+FALLBACK_RESPONSE_BASE = {
+    "urgency": "medium",
+    "mealRecommendations": {"breakfast": [], "lunch": [], "dinner": []},
+    "exercisePlan": [],
+    "diseases": [],
+    "ayurvedicMedication": {
+        "recommendations": [
+            {
+                "name": "Ayurvedic Consultation",
+                "description": "A qualified Ayurvedic practitioner would be able to provide personalized recommendations based on your doshas and current health condition. Due to API limitations, specific Ayurvedic recommendations cannot be provided at this time.",
+                "importance": "Ayurvedic medicine is highly personalized and should be prescribed by trained practitioners who can analyze your specific constitution and imbalances.",
+                "benefits": "Consulting with an Ayurvedic practitioner offers numerous benefits including a personalized treatment approach based on your unique constitution (prakriti), a holistic assessment that considers not just physical symptoms but your mental and emotional wellbeing, and access to safe, time-tested herbal formulations that can complement conventional medicine. Additionally, Ayurvedic treatments often focus on lifestyle modifications and dietary recommendations that address the root cause of your condition rather than just managing symptoms."
+            }
+        ]
+    },
+    "donts": ["Don't rely solely on automated analysis"]
+}
+
+# Fallback analysis returned when the Gemini API quota is exhausted
+QUOTA_EXCEEDED_RESPONSE = {
+    **FALLBACK_RESPONSE_BASE,
+    "possibleConditions": [
+        {
+            "name": "API Quota Exceeded",
+            "probability": 100,
+            "description": "The Google Gemini API quota has been exhausted. Please try again later or update your API key.",
+            "category": "error"
+        }
+    ],
+    "recommendation": "The system is currently experiencing high demand. Please try again later or contact support for assistance.",
+    "followUpActions": ["Try again later", "Contact support", "Consider updating the API key"],
+    "riskFactors": ["Unable to analyze symptoms due to API limitations"],
+    "preventiveMeasures": ["Consider using the offline symptom checker as an alternative"],
+    "dos": ["Contact healthcare provider for urgent concerns"]
+}
+
+# Fallback analysis returned for other Gemini API errors; the error condition is added per request
+API_ERROR_RESPONSE = {
+    **FALLBACK_RESPONSE_BASE,
+    "recommendation": "Please try again later or consult a healthcare professional directly.",
+    "followUpActions": ["Try again later", "Consult a healthcare professional"],
+    "riskFactors": ["Unable to analyze symptoms properly"],
+    "preventiveMeasures": ["Consult a healthcare professional"],
+    "dos": ["Consult a healthcare professional"]
+}
+
+# Cache parsed Gemini results so identical patient inputs skip the API call
+_gemini_cache = TTLCache(maxsize=Config.ANALYSIS_CACHE_SIZE, ttl=Config.ANALYSIS_CACHE_TTL)
+_gemini_cache_lock = threading.Lock()
+
+def make_cache_key(payload):
+    """Create a stable hash key for a JSON-serializable payload"""
+    serialized = orjson.dumps(payload, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.blake2b(serialized, digest_size=16).hexdigest()
+
+# Track anonymous quick analysis usage by hashed IP
+anonymous_quick_analysis_limiter = TokenBucketLimiter(
+    capacity=Config.ANONYMOUS_QUICK_ANALYSIS_LIMIT,
+    window=Config.ANONYMOUS_QUICK_ANALYSIS_WINDOW,
+    maxsize=Config.ANONYMOUS_QUICK_ANALYSIS_MAX_TRACKED
+)
+
+@app.after_request
+def after_request(response):
+    # Log only HTTP method and path
+    logger.info("%s %s - Status: %s", request.method, request.path, response.status_code)
+    return add_security_headers(compress_response(response))
+
+@app.route('/api/health', methods=['GET'])
+def health_check():
+    # A fresh Response per request, since after_request and CORS set headers on it
+    return Response(HEALTH_RESPONSE_BODY, mimetype="application/json")
+
+def coerce_symptom_severity(symptom):
+    """Return the symptom with a string severity converted to an int, defaulting to 5 if unparseable"""
+    severity = symptom.get('severity') if isinstance(symptom, dict) else None
+    if not isinstance(severity, str):
+        return symptom
+    try:
+        return {**symptom, 'severity': int(severity)}
+    except ValueError:
+        return {**symptom, 'severity': 5}  # Default to medium severity
+
+def prepare_symptom_analysis(data):
+    """
+    Validate a symptom analysis request and collect the values used in the prompt.
+    Returns a (prompt_context, error_response) tuple; error_response is None on success.
+    """
+    # Only log minimal information, not the entire request
+    symptoms = data.get('symptoms', [])
+    age = data.get('age', '')
+    gender = data.get('gender', '')
+    height = data.get('height', '')
+    weight = data.get('weight', '')
+    medical_history = data.get('medicalHistory', [])
+    medical_history_text = data.get('medicalHistoryText', '')
+    
+    # Get lifestyle factors
+    exercise_frequency = data.get('exerciseFrequency', 'moderate')
+    sleep_quality = data.get('sleepQuality', 'fair')
+    stress_level = data.get('stressLevel', 'moderate')
+    
+    logger.info("Analyzing %d symptoms with lifestyle factors", len(symptoms))
+    
+    # Convert severity to integers if they are strings, without touching the request data
+    if isinstance(symptoms, list):
+        symptoms = [coerce_symptom_severity(symptom) for symptom in symptoms]
+
+    # Validate symptoms data
+    validation_result = validate_symptoms(symptoms)
+    if not validation_result['valid']:
+        logger.error("Symptom validation failed: %s", validation_result['message'])
+        return None, (jsonify({"error": validation_result['message']}), 400)
+
+    if not api_key:
+        logger.error("Cannot process request: GEMINI_API_KEY not configured")
+        return None, (jsonify({
+            "error": "API key not configured",
+            "recommendation": "Please check server configuration"
+        }), 500)
+    
+    # Format symptoms for the prompt
+    formatted_symptoms = "\n".join(f"- {s['name']} (Severity: {s['severity']}/10, Duration: {s['duration']})" for s in symptoms)
+    formatted_medical_history = "\n".join(f"- {condition}" for condition in medical_history) or "None"
+    
+    # Get additional details from the request
+    diet_preference = data.get('dietPreference', 'balanced')
+    current_medications = data.get('currentMedications', '')
+    allergies = data.get('allergies', '')
+    recent_life_changes = data.get('recentLifeChanges', '')
+    
+    prompt_context = {
+        "age": age,
+        "gender": gender,
+        "height": height,
+        "weight": weight,
+        "formatted_symptoms": formatted_symptoms,
+        "formatted_medical_history": formatted_medical_history,
+        "medical_history": medical_history,
+        "medical_history_text": medical_history_text,
+        "exercise_frequency": exercise_frequency,
+        "sleep_quality": sleep_quality,
+        "stress_level": stress_level,
+        "diet_preference": diet_preference,
+        "current_medications": current_medications,
+        "allergies": allergies,
+        "recent_life_changes": recent_life_changes,
+        "reported_medications": current_medications or NONE_REPORTED,
+        "reported_allergies": allergies or NONE_REPORTED,
+        "reported_life_changes": recent_life_changes or NONE_REPORTED
+    }
+    return prompt_context, None
+
+# Fixed parts of the quick analysis prompt; only the age and symptoms lines change per request
+QUICK_ANALYSIS_PROMPT_HEAD = """
+        As a medical AI assistant, analyze the following symptoms briefly:
+
+        PATIENT INFORMATION:
+"""
+QUICK_ANALYSIS_PROMPT_TAIL = """        
+        Please provide a brief analysis as a single JSON object with exactly these fields:
+        
+        {
+            "possibleConditions": ["3-5 potential conditions that could explain these symptoms, from most to least likely, each as a simple name without percentages"],
+            "recommendation": "A single paragraph recommendation for the patient",
+            "urgency": "low, medium, or high"
+        }
+        
+        Return only the JSON object, with no other text or sections, and keep the analysis brief and focused.
+        DO NOT use asterisks (*) anywhere in your response.
+        """
+
+# Returned without calling Gemini when the description is too short to analyze
+INSUFFICIENT_SYMPTOMS_ANALYSIS = {
+    "possibleConditions": ["Insufficient symptom information"],
+    "recommendation": "Please provide a more detailed description of your symptoms.",
+    "urgency": "low"
+}
+
+def is_trivial_symptom_description(symptoms_description):
+    """Check for descriptions with too little text to be worth sending to Gemini"""
+    cleaned = str(symptoms_description).strip()
+    return len(cleaned) < 3 or sum(c.isalpha() for c in cleaned) < 2
+
+# Section patterns for parsing quick analysis responses
+QUICK_CONDITIONS_RE = re.compile(r'POSSIBLE CONDITIONS:(.*?)(?=RECOMMENDATION:|$)', re.DOTALL | re.IGNORECASE)
+QUICK_RECOMMENDATION_RE = re.compile(r'RECOMMENDATION:(.*?)(?=URGENCY LEVEL:|$)', re.DOTALL | re.IGNORECASE)
+QUICK_URGENCY_RE = re.compile(r'URGENCY LEVEL:(.*)', re.DOTALL | re.IGNORECASE)
+
+def extract_quick_sections(response_text):
+    """
+    Split a quick analysis response into its conditions, recommendation and urgency sections.
+    Responses using the prompted headings in order are split with plain string partitions;
+    otherwise each section is searched for separately. Missing sections are returned as None.
+    """
+    _, conditions_found, rest = response_text.partition("POSSIBLE CONDITIONS:")
+    conditions, recommendation_found, rest = rest.partition("RECOMMENDATION:")
+    recommendation, urgency_found, urgency = rest.partition("URGENCY LEVEL:")
+    if conditions_found and recommendation_found and urgency_found:
+        return conditions, recommendation, urgency
+    section_matches = (
+        QUICK_CONDITIONS_RE.search(response_text),
+        QUICK_RECOMMENDATION_RE.search(response_text),
+        QUICK_URGENCY_RE.search(response_text)
+    )
+    return tuple(match.group(1) if match else None for match in section_matches)
+
+# Urgency keywords in priority order, mapped to the level they normalize to
+URGENCY_KEYWORDS = (
+    ("high", "high"),
+    ("urgent", "high"),
+    ("severe", "high"),
+    ("medium", "medium"),
+    ("moderate", "medium"),
+    ("low", "low"),
+    ("mild", "low"),
+)
+
+def extract_condition_items(conditions_text):
+    """
+    Pull condition names out of the conditions section in one pass over its lines.
+    Numbered items ("1. Item" or "1) Item") are preferred; plain lines are used only
+    when the section has no numbered items.
+    """
+    numbered_items = []
+    plain_items = []
+    for line in conditions_text.splitlines():
+        item = line.strip()
+        if not item:
+            continue
+        digits = len(item) - len(item.lstrip('0123456789'))
+        if digits and item[digits:digits + 1] in ('.', ')'):
+            numbered_item = item[digits + 1:].strip()
+            if numbered_item:
+                numbered_items.append(numbered_item)
+        else:
+            plain_items.append(item)
+    return numbered_items or plain_items
+
+# Quick analyses are cached separately, keyed on the normalized age and symptom text
+_quick_analysis_cache = TTLCache(maxsize=Config.QUICK_ANALYSIS_CACHE_SIZE, ttl=Config.QUICK_ANALYSIS_CACHE_TTL)
+_quick_analysis_cache_lock = threading.Lock()
+
+def normalize_symptom_description(symptoms_description):
+    """Lowercase, collapse whitespace and drop edge punctuation so near-identical descriptions share a cache entry"""
+    return " ".join(str(symptoms_description).lower().split()).strip(" .,;:!?")
+
+# Gemini calls currently running, so concurrent identical requests share one API call
+_inflight_gemini_calls = {}
+_inflight_gemini_calls_lock = threading.Lock()
+INFLIGHT_WAIT_TIMEOUT = 120  # seconds, matches the gunicorn worker timeout
+
+def coalesce_gemini_call(key, call):
+    """
+    Run call() once per key at a time. Callers arriving while it is running wait for
+    and share its result (or exception) instead of issuing a duplicate request.
+    """
+    with _inflight_gemini_calls_lock:
+        future = _inflight_gemini_calls.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _inflight_gemini_calls[key] = future
+    
+    if not is_owner:
+        logger.info("Waiting on in-flight Gemini call for identical request")
+        return future.result(timeout=INFLIGHT_WAIT_TIMEOUT)
+    
+    try:
+        result = call()
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_gemini_calls_lock:
+            _inflight_gemini_calls.pop(key, None)
+
+# Generated PDFs keyed by report type and payload, shared by the authenticated and public endpoints
+_pdf_cache = TTLCache(maxsize=256, ttl=1800)
+_pdf_cache_lock = threading.Lock()
+
+# PDF rendering is CPU-bound, so it runs in worker processes instead of holding the GIL.
+# The pool is created on first use so each gunicorn worker gets its own after forking.
+_pdf_executor = None
+_pdf_executor_lock = threading.Lock()
+
+def get_pdf_executor():
+    """Return the process pool used for rendering PDFs, creating it if needed"""
+    global _pdf_executor
+    with _pdf_executor_lock:
+        if _pdf_executor is None:
+            _pdf_executor = ProcessPoolExecutor(
+                max_workers=Config.PDF_PROCESS_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pdf_executor
+
+def render_pdf_cached(report_type, data):
+    """Return a buffer with the PDF for this payload, rendering it only on a cache miss"""
+    cache_key = (report_type, make_cache_key(data))
+    with _pdf_cache_lock:
+        pdf_bytes = _pdf_cache.get(cache_key)
+    if pdf_bytes is None:
+        # Imported lazily to keep reportlab out of startup
+        from pdf_generator import render_pdf_bytes
+        pdf_bytes = get_pdf_executor().submit(render_pdf_bytes, report_type, data).result()
+        with _pdf_cache_lock:
+            _pdf_cache[cache_key] = pdf_bytes
+    else:
+        logger.info("Serving cached %s PDF", report_type)
+    return io.BytesIO(pdf_bytes)
+
+def cache_analysis_result(cache_key, result):
+    """Cache a parsed analysis result unless it represents an error"""
+    conditions = result.get('possibleConditions', [])
+    if conditions and conditions[0].get('category') != 'error':
+        with _gemini_cache_lock:
+            _gemini_cache[cache_key] = result
+
+@app.route('/api/analyze-symptoms', methods=['POST'])
+@rate_limit
+@validate_request_data
+@require_auth
+@limit_concurrent_analyses
+def analyze_symptoms():
+    try:
+        logger.info("POST %s - Processing request", request.path)
+        data = request.get_json()
+        
+        # Log user input with user ID
+        log_user_input("/api/analyze-symptoms", data, request.remote_addr, user_id=request.user_id)
+        
+        prompt_context, error_response = prepare_symptom_analysis(data)
+        if error_response:
+            return error_response
+        
+        # Identical inputs produce an identical prompt, so reuse a recent result
+        cache_key = make_cache_key(prompt_context)
+        with _gemini_cache_lock:
+            cached_result = _gemini_cache.get(cache_key)
+        if cached_result is not None:
+            logger.info("Returning cached analysis result")
+            return jsonify(cached_result)
+        
+        logger.info("Calling Gemini API for analysis")
+        
+        # Create the prompt for Gemini
+        prompt = render_analysis_prompt(prompt_context)
+
         try:
-            # Create model and specify parameters
-            model = genai.GenerativeModel(
-                model_name="gemini-1.5-pro",
-                generation_config={
-                    "temperature": 0.4,
-                    "top_p": 0.95,
-                    "top_k": 40,
-                    "max_output_tokens": 4096,
-                },
-                safety_settings=safety_settings
+            response_text = coalesce_gemini_call(
+                ("analysis", cache_key),
+                lambda: analysis_model.generate_content(prompt).text
             )
             
-            response = model.generate_content(prompt)
-            
             logger.info("Received Gemini API response and processing results")
             
             # Log the raw Gemini response in a single line format
             response_id = f"analyze_{int(time.time())}"
-            log_gemini_response(response_id, response.text)
+            log_gemini_response(response_id, response_text)
             
             # Parse and structure the response
-            result = parse_gemini_response(response.text)
+            result = parse_gemini_response(response_text)
             
             # Log only key stats about the result, not the entire content
-            logger.info(f"Analysis complete - Found {len(result['possibleConditions'])} conditions with urgency: {result['urgency']}")
+            logger.info("Analysis complete - Found %d conditions with urgency: %s", len(result['possibleConditions']), result['urgency'])
+            
+            # Only cache successful analyses so errors are retried on the next request
+            cache_analysis_result(cache_key, result)
             
             return jsonify(result)
         except Exception as api_error:
-            logger.error(f"Error calling Gemini API: {str(api_error)}")
+            logger.error("Error calling Gemini API: %s", api_error)
             # Check if this is a quota error
             error_message = str(api_error)
             if "429" in error_message and "quota" in error_message.lower():
-                return jsonify({
-                    "possibleConditions": [
-                        {
-                            "name": "API Quota Exceeded",
-                            "probability": 100,
-                            "description": "The Google Gemini API quota has been exhausted. Please try again later or update your API key.",
-                            "category": "error"
-                        }
-                    ],
-                    "recommendation": "The system is currently experiencing high demand. Please try again later or contact support for assistance.",
-                    "urgency": "medium",
-                    "followUpActions": ["Try again later", "Contact support", "Consider updating the API key"],
-                    "riskFactors": ["Unable to analyze symptoms due to API limitations"],
-                    "mealRecommendations": {"breakfast": [], "lunch": [], "dinner": []},
-                    "exercisePlan": [],
-                    "diseases": [],
-                    "preventiveMeasures": ["Consider using the offline symptom checker as an alternative"],
-                    "ayurvedicMedication": {
-                        "recommendations": [
-                            {
-                                "name": "Ayurvedic Consultation",
-                                "description": "A qualified Ayurvedic practitioner would be able to provide personalized recommendations based on your doshas and current health condition. Due to API limitations, specific Ayurvedic recommendations cannot be provided at this time.",
-                                "importance": "Ayurvedic medicine is highly personalized and should be prescribed by trained practitioners who can analyze your specific constitution and imbalances.",
-                                "benefits": "Consulting with an Ayurvedic practitioner offers numerous benefits including a personalized treatment approach based on your unique constitution (prakriti), a holistic assessment that considers not just physical symptoms but your mental and emotional wellbeing, and access to safe, time-tested herbal formulations that can complement conventional medicine. Additionally, Ayurvedic treatments often focus on lifestyle modifications and dietary recommendations that address the root cause of your condition rather than just managing symptoms."
-                            }
-                        ]
-                    },
-                    "dos": ["Contact healthcare provider for urgent concerns"],
-                    "donts": ["Don't rely solely on automated analysis"]
-                })
+                return jsonify(QUOTA_EXCEEDED_RESPONSE)
             # Provide default response in case of API error
             return jsonify({
+                **API_ERROR_RESPONSE,
                 "possibleConditions": [
                     {
                         "name": "API Error",
@@ -471,40 +839,292 @@ def analyze_symptoms():
                         "description": f"Unable to analyze symptoms: {str(api_error)}",
                         "category": "error"
                     }
-                ],
-                "recommendation": "Please try again later or consult a healthcare professional directly.",
-                "urgency": "medium",
-                "followUpActions": ["Try again later", "Consult a healthcare professional"],
-                "riskFactors": ["Unable to analyze symptoms properly"],
-                "mealRecommendations": {"breakfast": [], "lunch": [], "dinner": []},
-                "exercisePlan": [],
-                "diseases": [],
-                "preventiveMeasures": ["Consult a healthcare professional"],
-                "ayurvedicMedication": {
-                    "recommendations": [
-                        {
-                            "name": "Ayurvedic Consultation",
-                            "description": "A qualified Ayurvedic practitioner would be able to provide personalized recommendations based on your doshas and current health condition. Due to API limitations, specific Ayurvedic recommendations cannot be provided at this time.",
-                            "importance": "Ayurvedic medicine is highly personalized and should be prescribed by trained practitioners who can analyze your specific constitution and imbalances.",
-                            "benefits": "Consulting with an Ayurvedic practitioner offers numerous benefits including a personalized treatment approach based on your unique constitution (prakriti), a holistic assessment that considers not just physical symptoms but your mental and emotional wellbeing, and access to safe, time-tested herbal formulations that can complement conventional medicine. Additionally, Ayurvedic treatments often focus on lifestyle modifications and dietary recommendations that address the root cause of your condition rather than just managing symptoms."
-                        }
-                    ]
-                },
-                "dos": ["Consult a healthcare professional"],
-                "donts": ["Don't rely solely on automated analysis"]
+                ]
             })
 
     except Exception as e:
-        logger.error(f"Error in analyze_symptoms: {str(e)}")
+        logger.error("Error in analyze_symptoms: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/analyze-symptoms/stream', methods=['POST'])
+@rate_limit
+@validate_request_data
+@require_auth
+@limit_concurrent_analyses
+def analyze_symptoms_stream():
+    """Stream Gemini output as server-sent events, ending with the parsed result"""
+    try:
+        logger.info("POST %s - Processing request", request.path)
+        data = request.get_json()
+        
+        # Log user input with user ID
+        log_user_input("/api/analyze-symptoms/stream", data, request.remote_addr, user_id=request.user_id)
+        
+        prompt_context, error_response = prepare_symptom_analysis(data)
+        if error_response:
+            return error_response
+        
+        cache_key = make_cache_key(prompt_context)
+        with _gemini_cache_lock:
+            cached_result = _gemini_cache.get(cache_key)
+        
+        prompt = None if cached_result is not None else render_analysis_prompt(prompt_context)
+    except Exception as e:
+        logger.error("Error in analyze_symptoms_stream: %s", e)
         return jsonify({"error": str(e)}), 500
+    
+    def format_event(payload):
+        return f"data: {orjson.dumps(payload).decode('utf-8')}\n\n"
+    
+    def generate():
+        if cached_result is not None:
+            logger.info("Returning cached analysis result")
+            yield format_event({"result": cached_result})
+            return
+        
+        try:
+            logger.info("Calling Gemini API for streamed analysis")
+            # Forward each chunk as it arrives and keep it for the final parse
+            chunks = []
+            for chunk in analysis_model.generate_content(prompt, stream=True):
+                chunks.append(chunk.text)
+                yield format_event({"delta": chunk.text})
+            response_text = "".join(chunks)
+            
+            response_id = f"analyze_{int(time.time())}"
+            log_gemini_response(response_id, response_text)
+            
+            result = parse_gemini_response(response_text)
+            logger.info("Streamed analysis complete - Found %d conditions with urgency: %s", len(result['possibleConditions']), result['urgency'])
+            
+            cache_analysis_result(cache_key, result)
+            yield format_event({"result": result})
+        except Exception as api_error:
+            logger.error("Error calling Gemini API: %s", api_error)
+            yield format_event({"error": f"Unable to analyze symptoms: {str(api_error)}"})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+def parse_quick_analysis_json(response_text):
+    """
+    Parse a quick analysis returned as a JSON object, optionally inside a ```json fence.
+    Returns None if the text is not a well-formed analysis so the section parser can be used.
+    """
+    text = response_text.strip()
+    if text.startswith("```"):
+        text = text.partition("\n")[2].rpartition("```")[0]
+    try:
+        parsed = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(parsed, dict):
+        return None
+    
+    conditions = parsed.get("possibleConditions")
+    recommendation = parsed.get("recommendation")
+    urgency_text = parsed.get("urgency")
+    if not isinstance(conditions, list) or not isinstance(recommendation, str) or not isinstance(urgency_text, str):
+        return None
+    
+    conditions = [str(condition).strip() for condition in conditions if str(condition).strip()]
+    urgency_text = urgency_text.strip().lower()
+    return {
+        "possibleConditions": conditions or ["Symptom analysis inconclusive"],
+        "recommendation": recommendation.strip() or "Please consult a healthcare professional for a proper diagnosis.",
+        "urgency": next((level for keyword, level in URGENCY_KEYWORDS if keyword in urgency_text), "low")
+    }
+
+def parse_quick_analysis_text(response_text):
+    """Parse a quick analysis written as POSSIBLE CONDITIONS / RECOMMENDATION / URGENCY LEVEL sections"""
+    # Skip building debug payloads when the debug log is off
+    debug_enabled = is_debug_logging_enabled()
+    
+    # Log the start of parsing
+    log_debug("Starting to parse quick analysis response")
+    
+    conditions_section, recommendation_section, urgency_section = extract_quick_sections(response_text)
+    
+    # Extract possible conditions
+    conditions_text = conditions_section.strip() if conditions_section is not None else ""
+    
+    if debug_enabled:
+        log_debug("Found conditions section for quick analysis", {
+            "content_length": len(conditions_text),
+            "first_50_chars": conditions_text[:50] if conditions_text else "None"
+        })
+    
+    # Extract conditions list items
+    conditions = []
+    try:
+        conditions = extract_condition_items(conditions_text)
+        
+        if debug_enabled:
+            log_debug("Extracted quick analysis conditions", {
+                "count": len(conditions),
+                "conditions": conditions
+            })
+    except Exception as e:
+        if debug_enabled:
+            log_debug("Error extracting conditions", {"error": str(e)})
+    
+    # If still no conditions extracted, provide defaults
+    if not conditions:
+        log_debug("No conditions found, using defaults")
+        conditions = ["Symptom analysis inconclusive"]
+    
+    # Extract recommendation
+    recommendation = ""
+    try:
+        recommendation = recommendation_section.strip() if recommendation_section is not None else ""
+        
+        if debug_enabled:
+            log_debug("Extracted quick analysis recommendation", {
+                "length": len(recommendation),
+                "first_50_chars": recommendation[:50] if recommendation else "None"
+            })
+    except Exception as e:
+        if debug_enabled:
+            log_debug("Error extracting recommendation", {"error": str(e)})
+    
+    # If no recommendation found, provide a default
+    if not recommendation:
+        recommendation = "Please consult a healthcare professional for a proper diagnosis."
+        log_debug("Using default recommendation")
+    
+    # Extract urgency level
+    urgency = "medium"  # Default
+    try:
+        urgency_text = urgency_section.strip().lower() if urgency_section is not None else "medium"
+        
+        # Normalize urgency to one of three values, checking higher levels first
+        urgency = next((level for keyword, level in URGENCY_KEYWORDS if keyword in urgency_text), "low")
+        
+        if debug_enabled:
+            log_debug("Extracted quick analysis urgency", {
+                "raw_urgency": urgency_text,
+                "normalized_urgency": urgency
+            })
+    except Exception as e:
+        if debug_enabled:
+            log_debug("Error extracting urgency", {"error": str(e)})
+    
+    analysis = {
+        "possibleConditions": conditions,
+        "recommendation": recommendation,
+        "urgency": urgency
+    }
+    
+    if debug_enabled:
+        log_debug("Quick analysis parsing complete", {
+            "conditions_count": len(conditions),
+            "urgency": urgency
+        })
+    
+    return analysis
+
+def validate_quick_analysis_input(symptoms_description, age):
+    """Return an error response if the quick analysis input is unusable or oversized, otherwise None"""
+    if not isinstance(symptoms_description, str):
+        return jsonify({"error": "Symptoms must be provided as text"}), 400
+    # Oversized descriptions only add Gemini tokens and latency
+    if len(symptoms_description) > Config.QUICK_ANALYSIS_MAX_SYMPTOMS_LENGTH:
+        return jsonify({"error": f"Symptoms must be at most {Config.QUICK_ANALYSIS_MAX_SYMPTOMS_LENGTH} characters"}), 413
+    # A missing or null age is allowed; numbers and padded strings are checked by their digits
+    age_text = "" if age is None else str(age).strip()
+    if age_text and not (age_text.isdigit() and len(age_text) <= 3):
+        return jsonify({"error": "Age must be a whole number"}), 400
+    return None
+
+def run_quick_analysis(age, symptoms_description):
+    """
+    Run a quick Gemini analysis for one patient, serving repeats from the cache.
+    Returns a dict with possibleConditions, recommendation and urgency; Gemini errors propagate.
+    """
+    if is_trivial_symptom_description(symptoms_description):
+        logger.info("Skipping Gemini call for trivial symptom description")
+        return INSUFFICIENT_SYMPTOMS_ANALYSIS
+    
+    cache_key = make_cache_key({
+        "age": str(age).strip(),
+        "symptoms": normalize_symptom_description(symptoms_description)
+    })
+    with _quick_analysis_cache_lock:
+        cached_result = _quick_analysis_cache.get(cache_key)
+    if cached_result is not None:
+        logger.info("Quick analysis cache hit")
+        return cached_result
+    logger.info("Quick analysis cache miss")
+    
+    logger.info("Calling Gemini API for quick analysis")
+    
+    # Create the prompt for Gemini - simplified version
+    prompt = "".join((
+        QUICK_ANALYSIS_PROMPT_HEAD,
+        "        Age: ", str(age), "\n",
+        "        Symptoms: ", str(symptoms_description), "\n",
+        QUICK_ANALYSIS_PROMPT_TAIL
+    ))
+
+    response_text = coalesce_gemini_call(
+        ("quick", cache_key),
+        lambda: quick_analysis_model.generate_content(prompt).text
+    )
+    
+    logger.info("Received Gemini API response for quick analysis")
+    
+    # Log the raw Gemini response in a single line format
+    if is_debug_logging_enabled():
+        log_gemini_response(f"quick_{int(time.time())}", response_text)
+    
+    # The prompt asks for JSON; older-style section text is still handled
+    analysis = parse_quick_analysis_json(response_text)
+    if analysis is None:
+        analysis = parse_quick_analysis_text(response_text)
+    
+    with _quick_analysis_cache_lock:
+        _quick_analysis_cache[cache_key] = analysis
+    return analysis
+
+# Shared pool for batch quick analyses; its size caps concurrent Gemini calls from batches
+quick_analysis_executor = ThreadPoolExecutor(max_workers=Config.QUICK_ANALYSIS_BATCH_CONCURRENCY, thread_name_prefix="quick-analysis")
+
+def run_quick_analysis_safely(item):
+    """Quick-analyze one batch item, returning the fallback analysis if Gemini fails"""
+    try:
+        return run_quick_analysis(item.get('age', ''), item['symptoms'])
+    except Exception as api_error:
+        return quick_analysis_error_response(api_error)
+
+def quick_analysis_error_response(api_error):
+    """Build the fallback quick analysis returned when the Gemini call fails"""
+    logger.error("Error calling Gemini API: %s", api_error)
+    # Check if this is a quota error
+    error_message = str(api_error)
+    if "429" in error_message and "quota" in error_message.lower():
+        return {
+            "possibleConditions": ["API Quota Exceeded"],
+            "recommendation": "The Google Gemini API quota has been exhausted. Please try again later or update your API key.",
+            "urgency": "medium"
+        }
+    # Provide default response in case of API error
+    return {
+        "possibleConditions": ["API Error - Unable to analyze symptoms"],
+        "recommendation": "Please try again later or consult a healthcare professional directly.",
+        "urgency": "medium"
+    }
 
 @app.route('/api/quick-analyze', methods=['POST'])
 @rate_limit
 @validate_request_data
 @optional_auth
+@limit_concurrent_analyses
 def quick_analyze():
     try:
-        logger.info(f"POST /api/quick-analyze - Processing request")
+        logger.info("POST /api/quick-analyze - Processing request")
         data = request.get_json()
         
         # Get client IP
@@ -514,12 +1134,9 @@ def quick_analyze():
         user_id = get_current_user_id()
         is_first_request = True
         
-        # If not authenticated, check if they've used quick analysis before
+        # If not authenticated, check whether they still have a free quick analysis
         if user_id is None:
-            is_first_request = not has_used_quick_analysis(client_ip)
-            if is_first_request:
-                # Mark this IP as having used quick analysis
-                anonymous_quick_analysis_tracker[client_ip] = time.time()
+            is_first_request = anonymous_quick_analysis_limiter.consume(hash_ip(client_ip))
         
         # Log user input
         log_user_input("/api/quick-analyze", data, client_ip, user_id=user_id)
@@ -528,11 +1145,15 @@ def quick_analyze():
         symptoms_description = data.get('symptoms', '')
         age = data.get('age', '')
         
-        logger.info(f"Quick analyzing symptoms for age: {age}")
+        logger.info("Quick analyzing symptoms for age: %s", age)
         
         if not symptoms_description:
             logger.error("No symptoms provided")
             return jsonify({"error": "Please provide symptoms"}), 400
+        
+        error_response = validate_quick_analysis_input(symptoms_description, age)
+        if error_response:
+            return error_response
 
         if not api_key:
             logger.error("Cannot process request: GEMINI_API_KEY not configured")
@@ -541,280 +1162,126 @@ def quick_analyze():
                 "recommendation": "Please check server configuration"
             }), 500
         
-        logger.info(f"Calling Gemini API for quick analysis")
+        try:
+            analysis = run_quick_analysis(age, symptoms_description)
+        except Exception as api_error:
+            return jsonify(quick_analysis_error_response(api_error))
         
-        # Create the prompt for Gemini - simplified version
-        prompt = f"""
-        As a medical AI assistant, analyze the following symptoms briefly:
-
-        PATIENT INFORMATION:
-        Age: {age}
-        Symptoms: {symptoms_description}
+        # Add is_anonymous_first_request to the result
+        result = {**analysis, "is_anonymous_first_request": is_first_request}
         
-        Please provide a brief analysis with EACH section clearly separated:
+        logger.info("Quick analysis complete - Found %d conditions with urgency: %s", len(analysis['possibleConditions']), analysis['urgency'])
         
-        POSSIBLE CONDITIONS:
-        List 3-5 potential conditions that could explain these symptoms, from most to least likely.
-        Format each as a simple name without percentages.
+        return jsonify(result)
+
+    except Exception as e:
+        logger.error("Error in quick_analyze: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/quick-analyze-batch', methods=['POST'])
+@rate_limit
+@validate_request_data
+@require_auth
+@limit_concurrent_analyses
+def quick_analyze_batch():
+    try:
+        data = request.get_json()
+        log_user_input("/api/quick-analyze-batch", data, request.remote_addr, user_id=request.user_id)
+        
+        items = data.get('items', [])
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "Please provide a list of items to analyze"}), 400
+        if len(items) > Config.QUICK_ANALYSIS_BATCH_LIMIT:
+            return jsonify({"error": f"At most {Config.QUICK_ANALYSIS_BATCH_LIMIT} items can be analyzed per batch"}), 400
+        if not all(isinstance(item, dict) and item.get('symptoms') for item in items):
+            return jsonify({"error": "Please provide symptoms for every item"}), 400
+        for item in items:
+            error_response = validate_quick_analysis_input(item['symptoms'], item.get('age', ''))
+            if error_response:
+                return error_response
+
+        if not api_key:
+            logger.error("Cannot process request: GEMINI_API_KEY not configured")
+            return jsonify({
+                "error": "API key not configured",
+                "recommendation": "Please check server configuration"
+            }), 500
         
-        RECOMMENDATION:
-        Give a single paragraph recommendation for the patient.
+        # Run the Gemini calls concurrently so the batch takes about as long as its slowest item
+        results = list(quick_analysis_executor.map(run_quick_analysis_safely, items))
+        logger.info("Quick analysis batch complete - %d items", len(results))
         
-        URGENCY LEVEL:
-        Specify urgency as 'low', 'medium', or 'high' - one word only.
-        
-        DO NOT include any other sections and keep the analysis brief and focused.
-        DO NOT use asterisks (*) anywhere in your response.
-        """
-
-        try:
-            # Create model and specify parameters
-            model = genai.GenerativeModel(
-                model_name="gemini-1.5-pro",
-                generation_config={
-                    "temperature": 0.4,
-                    "top_p": 0.95,
-                    "top_k": 40,
-                    "max_output_tokens": 1024,
-                },
-                safety_settings=safety_settings
-            )
-            
-            response = model.generate_content(prompt)
-            
-            logger.info("Received Gemini API response for quick analysis")
-            
-            # Log the raw Gemini response in a single line format
-            response_id = f"quick_{int(time.time())}"
-            log_gemini_response(response_id, response.text)
-            
-            # Parse the quick response
-            response_text = response.text
-            
-            # Log the start of parsing
-            log_debug("Starting to parse quick analysis response")
-            
-            # Extract possible conditions
-            conditions_match = re.search(r'POSSIBLE CONDITIONS:(.*?)(?=RECOMMENDATION:|$)', response_text, re.DOTALL | re.IGNORECASE)
-            conditions_text = conditions_match.group(1).strip() if conditions_match else ""
-            
-            log_debug("Found conditions section for quick analysis", {
-                "content_length": len(conditions_text),
-                "first_50_chars": conditions_text[:50] if conditions_text else "None"
-            })
-            
-            # Extract conditions list items
-            conditions = []
-            try:
-                # Try different regex patterns to match the list items
-                # Pattern 1: Look for numbered list with format "1. Item"
-                condition_items = re.findall(r'(?:^|\n)(?:\d+\.\s*)([^\n]+)', conditions_text)
-                
-                # Pattern 2: If no matches, try looking for plain lines
-                if not condition_items:
-                    condition_items = [line.strip() for line in conditions_text.split('\n') if line.strip()]
-                
-                for item in condition_items:
-                    conditions.append(item.strip())
-                
-                log_debug("Extracted quick analysis conditions", {
-                    "count": len(conditions),
-                    "conditions": conditions
-                })
-            except Exception as e:
-                log_debug("Error extracting conditions", {"error": str(e)})
-            
-            # If still no conditions extracted, provide defaults
-            if not conditions:
-                log_debug("No conditions found, using defaults")
-                conditions = ["Symptom analysis inconclusive"]
-            
-            # Extract recommendation
-            recommendation = ""
-            try:
-                recommendation_match = re.search(r'RECOMMENDATION:(.*?)(?=URGENCY LEVEL:|$)', response_text, re.DOTALL | re.IGNORECASE)
-                recommendation = recommendation_match.group(1).strip() if recommendation_match else ""
-                
-                log_debug("Extracted quick analysis recommendation", {
-                    "length": len(recommendation),
-                    "first_50_chars": recommendation[:50] if recommendation else "None"
-                })
-            except Exception as e:
-                log_debug("Error extracting recommendation", {"error": str(e)})
-            
-            # If no recommendation found, provide a default
-            if not recommendation:
-                recommendation = "Please consult a healthcare professional for a proper diagnosis."
-                log_debug("Using default recommendation")
-            
-            # Extract urgency level
-            urgency = "medium"  # Default
-            try:
-                urgency_match = re.search(r'URGENCY LEVEL:(.*?)(?=$)', response_text, re.DOTALL | re.IGNORECASE)
-                urgency_text = urgency_match.group(1).strip().lower() if urgency_match else "medium"
-                
-                # Normalize urgency to one of three values
-                if 'high' in urgency_text:
-                    urgency = "high"
-                elif 'medium' in urgency_text or 'moderate' in urgency_text:
-                    urgency = "medium"
-                else:
-                    urgency = "low"
-                
-                log_debug("Extracted quick analysis urgency", {
-                    "raw_urgency": urgency_text,
-                    "normalized_urgency": urgency
-                })
-            except Exception as e:
-                log_debug("Error extracting urgency", {"error": str(e)})
-            
-            # Add is_anonymous_first_request to the result
-            result = {
-                "possibleConditions": conditions,
-                "recommendation": recommendation,
-                "urgency": urgency,
-                "is_anonymous_first_request": is_first_request
-            }
-            
-            log_debug("Quick analysis parsing complete", {
-                "conditions_count": len(conditions),
-                "urgency": urgency
-            })
-            
-            logger.info(f"Quick analysis complete - Found {len(conditions)} conditions with urgency: {urgency}")
-            
-            return jsonify(result)
-        except Exception as api_error:
-            logger.error(f"Error calling Gemini API: {str(api_error)}")
-            # Check if this is a quota error
-            error_message = str(api_error)
-            if "429" in error_message and "quota" in error_message.lower():
-                return jsonify({
-                    "possibleConditions": ["API Quota Exceeded"],
-                    "recommendation": "The Google Gemini API quota has been exhausted. Please try again later or update your API key.",
-                    "urgency": "medium"
-                })
-            # Provide default response in case of API error
-            return jsonify({
-                "possibleConditions": ["API Error - Unable to analyze symptoms"],
-                "recommendation": "Please try again later or consult a healthcare professional directly.",
-                "urgency": "medium"
-            })
+        return jsonify({"results": results})
 
     except Exception as e:
-        logger.error(f"Error in quick_analyze: {str(e)}")
+        logger.error("Error in quick_analyze_batch: %s", e)
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/generate-overview-pdf', methods=['POST'])
-@require_auth
-def generate_overview_pdf_endpoint():
+# Attachment name and log label for each PDF report type
+PDF_REPORTS = {
+    "overview": ("healthvitals-overview-report.pdf", "overview"),
+    "details": ("healthvitals-detailed-report.pdf", "detailed"),
+}
+
+def send_pdf_report(report_type, audience=""):
+    """Render the requested report from the JSON body and return it as a PDF attachment"""
+    download_name, label = PDF_REPORTS[report_type]
+    label = f"{audience} {label}" if audience else label
     try:
         data = request.get_json()
         if not data:
             return jsonify({"error": "No data provided"}), 400
         
         # Log request for debugging
-        logger.info(f"Generating overview PDF report")
+        logger.info("Generating %s PDF report", label)
         
-        # Generate the PDF using the utility
-        pdf_buffer = generate_overview_pdf(data)
+        # Generate the PDF in the rendering pool
+        pdf_buffer = render_pdf_cached(report_type, data)
         
         # Return the PDF file
         return send_file(
             pdf_buffer,
             mimetype='application/pdf',
             as_attachment=True,
-            download_name='healthvitals-overview-report.pdf'
+            download_name=download_name
         )
     except Exception as e:
-        logger.error(f"Error generating overview PDF: {str(e)}")
+        logger.error("Error generating %s PDF: %s", label, e)
         return jsonify({"error": f"Failed to generate PDF: {str(e)}"}), 500
 
+@app.route('/api/generate-overview-pdf', methods=['POST'])
+@require_auth
+def generate_overview_pdf_endpoint():
+    return send_pdf_report("overview")
 
 @app.route('/api/generate-details-pdf', methods=['POST'])
 @require_auth
 def generate_details_pdf_endpoint():
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        # Log request for debugging
-        logger.info(f"Generating detailed PDF report")
-        
-        # Generate the PDF using the utility
-        pdf_buffer = generate_details_pdf(data)
-        
-        # Return the PDF file
-        return send_file(
-            pdf_buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name='healthvitals-detailed-report.pdf'
-        )
-    except Exception as e:
-        logger.error(f"Error generating detailed PDF: {str(e)}")
-        return jsonify({"error": f"Failed to generate PDF: {str(e)}"}), 500
+    return send_pdf_report("details")
 
 # New endpoints that don't require authentication for PDF generation
 @app.route('/api/public/generate-overview-pdf', methods=['POST'])
 @rate_limit
 @validate_request_data
 def generate_overview_pdf_public():
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        # Log request for debugging
-        logger.info(f"Generating public overview PDF report")
-        
-        # Generate the PDF using the utility
-        pdf_buffer = generate_overview_pdf(data)
-        
-        # Return the PDF file
-        return send_file(
-            pdf_buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name='healthvitals-overview-report.pdf'
-        )
-    except Exception as e:
-        logger.error(f"Error generating public overview PDF: {str(e)}")
-        return jsonify({"error": f"Failed to generate PDF: {str(e)}"}), 500
-
+    return send_pdf_report("overview", "public")
 
 @app.route('/api/public/generate-details-pdf', methods=['POST'])
 @rate_limit
 @validate_request_data
 def generate_details_pdf_public():
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        # Log request for debugging
-        logger.info(f"Generating public detailed PDF report")
-        
-        # Generate the PDF using the utility
-        pdf_buffer = generate_details_pdf(data)
-        
-        # Return the PDF file
-        return send_file(
-            pdf_buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name='healthvitals-detailed-report.pdf'
-        )
-    except Exception as e:
-        logger.error(f"Error generating public detailed PDF: {str(e)}")
-        return jsonify({"error": f"Failed to generate PDF: {str(e)}"}), 500
+    return send_pdf_report("details", "public")
+
+# Uploaded reports are copied to disk in 1 MiB chunks rather than werkzeug's 16 KiB default
+UPLOAD_COPY_BUFFER_SIZE = 1024 * 1024
 
 @app.route('/api/analyze-reports', methods=['POST'])
 @rate_limit
+@limit_concurrent_analyses
 def analyze_reports():
     try:
         logger.info("Starting report analysis...")
+        start_time = time.time()
         
         # Check if files were uploaded
         if 'reports' not in request.files:
@@ -828,25 +1295,24 @@ def analyze_reports():
             logger.error("Empty file list received")
             return jsonify({"error": "No files uploaded"}), 400
         
-        logger.info(f"Received {len(files)} files: {', '.join([f.filename for f in files if f.filename])}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received %d files: %s", len(files), ', '.join([f.filename for f in files if f.filename]))
         
         # Get the analysis result and symptoms for context
         try:
-            analysis_result = json.loads(request.form.get('analysisResult', '{}'))
-            selected_symptoms = json.loads(request.form.get('selectedSymptoms', '[]'))
-            logger.info(f"Successfully parsed analysis_result and selected_symptoms from request")
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON from request: {str(e)}")
+            analysis_result = orjson.loads(request.form.get('analysisResult', '{}'))
+            selected_symptoms = orjson.loads(request.form.get('selectedSymptoms', '[]'))
+            logger.debug("Successfully parsed analysis_result and selected_symptoms from request")
+        except orjson.JSONDecodeError as e:
+            logger.error("Failed to parse JSON from request: %s", e)
             return jsonify({"error": "Invalid JSON data in request"}), 400
         
-        logger.info(f"Analyzing {len(files)} medical reports")
+        logger.debug("Analyzing %d medical reports", len(files))
         
-        # Create a temporary directory to store uploaded files
-        temp_dir = os.path.join(tempfile.gettempdir(), str(uuid.uuid4()))
-        os.makedirs(temp_dir, exist_ok=True)
-        logger.info(f"Created temporary directory: {temp_dir}")
-        
-        try:
+        # Store uploaded files in a temporary directory that is removed on every exit path
+        with tempfile.TemporaryDirectory(prefix="reports_", dir=Config.REPORT_UPLOAD_DIR) as temp_dir:
+            logger.debug("Created temporary directory: %s", temp_dir)
+            
             # Process and save each file
             file_paths = []
             for file in files:
@@ -855,225 +1321,60 @@ def analyze_reports():
                         # Create a secure filename
                         filename = secure_filename(file.filename)
                         filepath = os.path.join(temp_dir, filename)
-                        file.save(filepath)
-                        file_size = os.path.getsize(filepath) / 1024  # KB
-                        logger.info(f"Saved file: {filename} ({file_size:.1f} KB)")
+                        with open(filepath, 'wb') as saved_file:
+                            file.save(saved_file, buffer_size=UPLOAD_COPY_BUFFER_SIZE)
+                            file_size = saved_file.tell() / 1024  # KB
+                        logger.debug("Saved file: %s (%.1f KB)", filename, file_size)
                         file_paths.append(filepath)
                     except Exception as file_err:
-                        logger.error(f"Error saving file {file.filename}: {str(file_err)}")
+                        logger.error("Error saving file %s: %s", file.filename, file_err)
             
             if not file_paths:
                 logger.error("No files were successfully saved")
                 return jsonify({"error": "Failed to process uploaded files"}), 400
             
-            logger.info(f"Successfully saved {len(file_paths)} files, generating prompt...")
+            logger.debug("Successfully saved %d files, generating prompt...", len(file_paths))
             
             # Analyze the medical reports using Gemini API
             prompt = create_report_analysis_prompt(file_paths, analysis_result, selected_symptoms)
-            logger.info("Generated prompt for Gemini API, sending request...")
+            logger.debug("Generated prompt for Gemini API, sending request...")
             
             report_analysis = analyze_medical_reports_with_gemini(prompt)
-            logger.info("Successfully received and parsed response from Gemini API")
-            
-            # Clean up temporary files
-            for file_path in file_paths:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            os.rmdir(temp_dir)
-            logger.info("Cleaned up temporary files")
+            logger.info("Report analysis done: files=%d, elapsed=%.2fs", len(file_paths), time.time() - start_time)
             
             return jsonify(report_analysis)
-        except Exception as e:
-            logger.error(f"Error during report analysis: {str(e)}")
-            logger.error(f"Exception traceback: {traceback.format_exc()}")
-            # Ensure cleanup in case of errors
-            if os.path.exists(temp_dir):
-                try:
-                    shutil.rmtree(temp_dir)
-                    logger.info("Cleaned up temporary directory after error")
-                except Exception as cleanup_err:
-                    logger.error(f"Error cleaning up temp dir: {str(cleanup_err)}")
-            raise e
     except Exception as e:
-        logger.error(f"Error analyzing reports: {str(e)}")
-        logger.error(f"Exception traceback: {traceback.format_exc()}")
+        logger.error("Error analyzing reports: %s", e)
+        logger.error("Exception traceback: %s", traceback.format_exc())
         return jsonify({"error": f"Failed to analyze reports: {str(e)}"}), 500
 
 
-# Helper function to create a prompt for the Gemini API based on reports and context
-def create_report_analysis_prompt(file_paths, analysis_result, selected_symptoms):
-    # Extract comprehensive user information
-    age = analysis_result.get('age', 'Not provided')
-    gender = analysis_result.get('gender', 'Not provided')
-    height = analysis_result.get('height', 'Not provided')
-    weight = analysis_result.get('weight', 'Not provided')
-    medical_history = analysis_result.get('medicalHistory', [])
-    medical_history_text = analysis_result.get('medicalHistoryText', '')
+# Prompt for the report analysis, filled in per request by create_report_analysis_prompt
+REPORT_ANALYSIS_PROMPT_TEMPLATE = """
+    You are a medical assistant tasked with analyzing medical reports, X-rays, and doctor prescriptions.
+    
     
-    # Lifestyle factors
-    exercise_frequency = analysis_result.get('exerciseFrequency', 'Not provided')
-    sleep_quality = analysis_result.get('sleepQuality', 'Not provided')
-    stress_level = analysis_result.get('stressLevel', 'Not provided')
-    diet_preference = analysis_result.get('dietPreference', 'Not provided')
-    allergies = analysis_result.get('allergies', 'Not provided')
-    current_medications = analysis_result.get('currentMedications', 'Not provided')
-    recent_life_changes = analysis_result.get('recentLifeChanges', 'Not provided')
-    
-    # Format patient profile
-    patient_profile = f"""
     Patient Profile:
     - Age: {age}
     - Gender: {gender}
     - Height: {height}
     - Weight: {weight}
-    - Exercise Frequency: {exercise_frequency}
-    - Sleep Quality: {sleep_quality}
-    - Stress Level: {stress_level}
-    - Diet Preference: {diet_preference}
+    - Exercise Frequency: {exerciseFrequency}
+    - Sleep Quality: {sleepQuality}
+    - Stress Level: {stressLevel}
+    - Diet Preference: {dietPreference}
     - Allergies: {allergies}
-    - Current Medications: {current_medications}
-    - Recent Life Changes: {recent_life_changes}
-    """
-    
-    # Format medical history
-    medical_history_formatted = "Medical History:\n"
-    if medical_history:
-        medical_history_formatted += "\n".join([f"- {condition}" for condition in medical_history])
-    elif medical_history_text:
-        medical_history_formatted += medical_history_text
-    else:
-        medical_history_formatted += "None reported"
-    
-    # Format symptoms
-    symptoms_text = "Symptoms reported by patient:\n"
-    for symptom in selected_symptoms:
-        symptoms_text += f"- {symptom['name']} (Severity: {symptom['severity']}/10, Duration: {symptom['duration']})\n"
-    
-    # Format initial analysis
-    conditions_text = "Initial analysis suggested these conditions:\n"
-    for condition in analysis_result.get('possibleConditions', []):
-        conditions_text += f"- {condition['name']} ({condition['probability']}% probability): {condition.get('description', '')}\n"
-    
-    recommendations_text = "Initial recommendations:\n" + analysis_result.get('recommendation', 'None provided')
-    
-    # Count file types for better guidance to the model
-    image_count = 0
-    pdf_count = 0
-    doc_count = 0
-    
-    # Format uploaded files info
-    files_info = "Uploaded medical reports summary:\n"
-    for path in file_paths:
-        file_name = os.path.basename(path)
-        file_extension = os.path.splitext(file_name)[1].lower()
-        file_size = os.path.getsize(path) / 1024  # Convert to KB
-        
-        file_type = "Unknown"
-        if file_extension in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp']:
-            file_type = "Medical Image/X-Ray"
-            image_count += 1
-        elif file_extension == '.pdf':
-            file_type = "Medical Report PDF"
-            pdf_count += 1
-        elif file_extension in ['.doc', '.docx', '.txt', '.rtf']:
-            file_type = "Medical Document"
-            doc_count += 1
-        
-        files_info += f"- {file_name} ({file_type}, {file_size:.1f} KB)\n"
-    
-    # Image-specific guidance for models
-    image_guidance = ""
-    if image_count > 0:
-        image_guidance = """
-        IMPORTANT GUIDANCE FOR IMAGE ANALYSIS:
-        
-        For the medical images provided (X-rays, scans, CBC reports, etc.):
-        1. If you see lab reports like CBC, blood tests, metabolic panels:
-           - Identify the type of test (CBC, lipid panel, etc.)
-           - Look for values outside normal ranges and highlight them
-           - Identify patterns like anemia, infection, inflammation based on values
-           - Connect abnormal values to patient's symptoms
-           
-        2. If you see X-rays or radiological images:
-           - Describe visible structures and any abnormalities
-           - Note any structural issues, opacities, or concerning features
-           - Explain how these findings might relate to symptoms
-           
-        3. For prescription images:
-           - Note all medications prescribed
-           - Identify dosage and frequency where visible
-           - Explain the purpose of these medications
-           - Flag any potential interactions with current medications
-           
-        4. For any medical report images:
-           - Look for doctor's notes or summary sections
-           - Extract key medical terms, diagnoses, or recommendations
-           - Note dates of tests/treatments for timeline context
-        """
-    
-    # Extract text from PDF files if possible
-    pdf_text = ""
-    try:
-        import fitz  # PyMuPDF
-        logger.info("PyMuPDF successfully imported, processing PDF files...")
-        
-        for path in file_paths:
-            if path.lower().endswith('.pdf'):
-                try:
-                    logger.info(f"Processing PDF file: {os.path.basename(path)}")
-                    doc = fitz.open(path)
-                    page_count = doc.page_count
-                    logger.info(f"PDF has {page_count} pages")
-                    
-                    # Process all pages up to a maximum of 5
-                    for page_num in range(min(5, page_count)):
-                        try:
-                            page = doc[page_num]
-                            page_text = page.get_text().strip()
-                            text_length = min(1500, len(page_text))  # Increased text length limit further
-                            
-                            pdf_text += f"\nContent from {os.path.basename(path)} (page {page_num+1}):\n"
-                            pdf_text += page_text[:text_length]
-                            if text_length < len(page_text):
-                                pdf_text += "\n... (truncated)"
-                            
-                            logger.info(f"Extracted {text_length} characters from page {page_num+1}")
-                        except Exception as page_err:
-                            logger.error(f"Error extracting text from page {page_num+1}: {str(page_err)}")
-                    
-                    doc.close()
-                except Exception as e:
-                    logger.error(f"Failed to extract text from PDF {path}: {str(e)}")
-                    logger.error(traceback.format_exc())
-    except ImportError:
-        logger.warning("PyMuPDF not installed, skipping PDF text extraction")
-        pdf_text = "PDF text extraction is not available. Please install PyMuPDF package."
-    except Exception as e:
-        logger.error(f"Unexpected error during PDF extraction: {str(e)}")
-        logger.error(traceback.format_exc())
-    
-    # Create specialized prompt based on uploaded file types
-    file_type_guidance = ""
-    if image_count > 0 and pdf_count == 0:
-        file_type_guidance = "The user has only uploaded image files. Please provide analysis based on these medical images without text extraction. Look for visual patterns in lab reports, X-rays, or medical documents."
-    elif image_count == 0 and pdf_count > 0:
-        file_type_guidance = "The user has uploaded PDF documents. Please focus on analyzing the extracted text from these medical reports."
-    elif image_count > 0 and pdf_count > 0:
-        file_type_guidance = "The user has uploaded both images and PDF documents. Please provide a comprehensive analysis combining information from both types of files."
-    
-    # Final prompt
-    prompt = f"""
-    You are a medical assistant tasked with analyzing medical reports, X-rays, and doctor prescriptions.
+    - Current Medications: {currentMedications}
+    - Recent Life Changes: {recentLifeChanges}
     
-    {patient_profile}
     
-    {medical_history_formatted}
+    {medical_history}
     
-    {symptoms_text}
+    {symptoms}
     
-    {conditions_text}
+    {conditions}
     
-    {recommendations_text}
+    {recommendations}
     
     Uploaded files information:
     {files_info}
@@ -1082,7 +1383,7 @@ def create_report_analysis_prompt(file_paths, analysis_result, selected_symptoms
     
     {image_guidance}
     
-    {pdf_text if pdf_text else "No text could be extracted from the uploaded files. Please focus on analyzing any medical images provided based on their content type."}
+    {pdf_text}
     
     Based on all the provided information, including the patient's profile, symptoms, medical history, and uploaded reports, provide a comprehensive analysis with:
 
@@ -1147,11 +1448,228 @@ def create_report_analysis_prompt(file_paths, analysis_result, selected_symptoms
     
     Ensure your analysis is medically sound and takes into account both the initial symptoms analysis and the additional information from the uploaded medical documents. If you cannot extract specific values from images, provide general insights based on the type of medical document (CBC report, X-ray, etc.) and how it relates to the patient's symptoms.
     """
+
+# analysis_result keys rendered in the report prompt's patient profile, 'Not provided' when missing
+REPORT_PROFILE_FIELDS = (
+    'age', 'gender', 'height', 'weight', 'exerciseFrequency', 'sleepQuality', 'stressLevel',
+    'dietPreference', 'allergies', 'currentMedications', 'recentLifeChanges',
+)
+
+REPORT_ANALYSIS_PROMPT_PARTS = tuple(
+    (literal, field) for literal, field, _, _ in string.Formatter().parse(REPORT_ANALYSIS_PROMPT_TEMPLATE)
+)
+
+# Extra instructions added to the report prompt when images were uploaded
+REPORT_IMAGE_GUIDANCE = """
+        IMPORTANT GUIDANCE FOR IMAGE ANALYSIS:
+        
+        For the medical images provided (X-rays, scans, CBC reports, etc.):
+        1. If you see lab reports like CBC, blood tests, metabolic panels:
+           - Identify the type of test (CBC, lipid panel, etc.)
+           - Look for values outside normal ranges and highlight them
+           - Identify patterns like anemia, infection, inflammation based on values
+           - Connect abnormal values to patient's symptoms
+           
+        2. If you see X-rays or radiological images:
+           - Describe visible structures and any abnormalities
+           - Note any structural issues, opacities, or concerning features
+           - Explain how these findings might relate to symptoms
+           
+        3. For prescription images:
+           - Note all medications prescribed
+           - Identify dosage and frequency where visible
+           - Explain the purpose of these medications
+           - Flag any potential interactions with current medications
+           
+        4. For any medical report images:
+           - Look for doctor's notes or summary sections
+           - Extract key medical terms, diagnoses, or recommendations
+           - Note dates of tests/treatments for timeline context
+        """
+
+# Placeholder used in the report prompt when no PDF text could be extracted
+NO_PDF_TEXT = "No text could be extracted from the uploaded files. Please focus on analyzing any medical images provided based on their content type."
+
+# Helper function to create a prompt for the Gemini API based on reports and context
+def create_report_analysis_prompt(file_paths, analysis_result, selected_symptoms):
+    # Patient details shown in the profile block, one dict pass instead of a local per field
+    prompt_context = {key: analysis_result.get(key, 'Not provided') for key in REPORT_PROFILE_FIELDS}
+    medical_history = analysis_result.get('medicalHistory', [])
+    medical_history_text = analysis_result.get('medicalHistoryText', '')
+    
+    # Format medical history
+    if medical_history:
+        medical_history_formatted = "Medical History:\n" + "\n".join([f"- {condition}" for condition in medical_history])
+    else:
+        medical_history_formatted = "Medical History:\n" + (medical_history_text or "None reported")
+    
+    # Format symptoms
+    symptoms_text = "Symptoms reported by patient:\n" + "".join([
+        f"- {symptom['name']} (Severity: {symptom['severity']}/10, Duration: {symptom['duration']})\n"
+        for symptom in selected_symptoms
+    ])
+    
+    # Format initial analysis
+    conditions_text = "Initial analysis suggested these conditions:\n" + "".join([
+        f"- {condition['name']} ({condition['probability']}% probability): {condition.get('description', '')}\n"
+        for condition in analysis_result.get('possibleConditions', [])
+    ])
+    
+    recommendations_text = "Initial recommendations:\n" + analysis_result.get('recommendation', 'None provided')
+    
+    # Count file types for better guidance to the model
+    image_count = 0
+    pdf_count = 0
+    doc_count = 0
     
-    logger.info("Created prompt for Gemini API with all patient information and enhanced image/PDF guidance")
+    # Format uploaded files info
+    files_lines = ["Uploaded medical reports summary:\n"]
+    for path in file_paths:
+        file_name = os.path.basename(path)
+        file_extension = os.path.splitext(file_name)[1].lower()
+        file_size = os.path.getsize(path) / 1024  # Convert to KB
+        
+        file_type = "Unknown"
+        if file_extension in ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.webp']:
+            file_type = "Medical Image/X-Ray"
+            image_count += 1
+        elif file_extension == '.pdf':
+            file_type = "Medical Report PDF"
+            pdf_count += 1
+        elif file_extension in ['.doc', '.docx', '.txt', '.rtf']:
+            file_type = "Medical Document"
+            doc_count += 1
+        
+        files_lines.append(f"- {file_name} ({file_type}, {file_size:.1f} KB)\n")
+    files_info = "".join(files_lines)
+    
+    # Image-specific guidance for models
+    image_guidance = REPORT_IMAGE_GUIDANCE if image_count > 0 else ""
+    
+    # Extract text from PDF files if possible, reading all files at once in the PDF process pool
+    pdf_parts = []
+    pdf_length = 0
+    pdf_paths = [path for path in file_paths if path.lower().endswith('.pdf')]
+    if pdf_paths:
+        from pdf_generator import extract_pdf_text
+        executor = get_pdf_executor()
+        pending = [(path, executor.submit(extract_pdf_text, path)) for path in pdf_paths]
+        for path, future in pending:
+            try:
+                file_text, page_errors = future.result()
+                for page_num, error in page_errors:
+                    logger.warning("Error extracting text from page %d of %s: %s", page_num, os.path.basename(path), error)
+                logger.debug("Extracted %d characters from PDF %s", len(file_text), os.path.basename(path))
+                pdf_parts.append(file_text)
+                pdf_length += len(file_text)
+                # Cap the total so many large uploads cannot blow up the prompt
+                if pdf_length >= Config.REPORT_PDF_TEXT_LIMIT:
+                    pdf_parts = ["".join(pdf_parts)[:Config.REPORT_PDF_TEXT_LIMIT], "\n... (truncated)"]
+                    for _, remaining in pending:
+                        remaining.cancel()
+                    break
+            except ImportError:
+                logger.warning("PyMuPDF not installed, skipping PDF text extraction")
+                pdf_parts = ["PDF text extraction is not available. Please install PyMuPDF package."]
+                break
+            except Exception as e:
+                logger.error("Failed to extract text from PDF %s: %s", path, e)
+    
+    # Create specialized prompt based on uploaded file types
+    file_type_guidance = ""
+    if image_count > 0 and pdf_count == 0:
+        file_type_guidance = "The user has only uploaded image files. Please provide analysis based on these medical images without text extraction. Look for visual patterns in lab reports, X-rays, or medical documents."
+    elif image_count == 0 and pdf_count > 0:
+        file_type_guidance = "The user has uploaded PDF documents. Please focus on analyzing the extracted text from these medical reports."
+    elif image_count > 0 and pdf_count > 0:
+        file_type_guidance = "The user has uploaded both images and PDF documents. Please provide a comprehensive analysis combining information from both types of files."
+    
+    # Final prompt, joined from the pre-split template in one pass
+    prompt_context.update({
+        "medical_history": medical_history_formatted,
+        "symptoms": symptoms_text,
+        "conditions": conditions_text,
+        "recommendations": recommendations_text,
+        "files_info": files_info,
+        "file_type_guidance": file_type_guidance,
+        "image_guidance": image_guidance,
+        "pdf_text": "".join(pdf_parts) or NO_PDF_TEXT,
+    })
+    prompt = render_prompt(REPORT_ANALYSIS_PROMPT_PARTS, prompt_context)
+    
+    logger.debug("Created prompt for Gemini API with all patient information and enhanced image/PDF guidance")
     return prompt
 
 
+# Patterns for pulling report analysis fields out of a response that was not valid JSON
+REPORT_RECOMMENDATION_RE = re.compile(r'(?:Recommendation|RECOMMENDATION)[:\s]+(.*?)(?:\n\n|\n[A-Z]|$)', re.DOTALL | re.IGNORECASE)
+REPORT_HEALTH_SCORE_RE = re.compile(r'(?:Health Score|HEALTH SCORE)[:\s]+(\d+(?:\.\d+)?)', re.IGNORECASE)
+REPORT_FINDINGS_RE = re.compile(r'(?:Key Findings|KEY FINDINGS)(?:from Reports)?[:\s]+(.*?)(?:\n\n|\n[A-Z]|$)', re.DOTALL | re.IGNORECASE)
+REPORT_LAB_HEADER_RE = re.compile(r'CBC|Blood Test|Laboratory|Lab Results?|Hematology|Blood Count', re.IGNORECASE)
+REPORT_HEADER_LINE_RE = re.compile(r'^[A-Z\s]+:$')
+REPORT_TEST_RESULT_HEAD_RE = re.compile(r'(?:indicated|showed|revealed|found|identified|detected|present(?:s|ed)?|observed)[^.]+', re.IGNORECASE)
+# A line starting with a letter opens a new section, as does a blank line
+REPORT_SECTION_START_RE = re.compile(r'[A-Z]', re.IGNORECASE)
+REPORT_TEST_MENTION_RE = re.compile(r'CBC|blood test|x-ray|MRI|scan|laboratory|hematology', re.IGNORECASE)
+REPORT_SUMMARY_RE = re.compile(r'(?:Summary|SUMMARY)[:\s]+(.*?)(?:\n\n|$)', re.DOTALL | re.IGNORECASE)
+REPORT_FOLLOWUP_RE = re.compile(r'(?:Follow-up Actions?|FOLLOW-UP ACTIONS?)[:\s]+(.*?)(?:\n\n|\n[A-Z]|$)', re.DOTALL | re.IGNORECASE)
+REPORT_RISK_FACTORS_RE = re.compile(r'(?:Risk Factors?|RISK FACTORS?)[:\s]+(.*?)(?:\n\n|\n[A-Z]|$)', re.DOTALL | re.IGNORECASE)
+REPORT_LIST_SPLIT_RE = re.compile(r'(?:\n|•|\*|\d+\.)\s*')
+WHITESPACE_RE = re.compile(r'\s+')
+
+def extract_json_fence(text):
+    """Return the stripped body of the first ```json fence in text, or None if there is no closed fence"""
+    # Plain substring searches; the fence is usually at the very start of the response
+    start = text.find("```json")
+    if start == -1:
+        return None
+    end = text.find("```", start + 7)
+    if end == -1:
+        return None
+    return text[start + 7:end].strip()
+
+def find_section_end(lines, start):
+    """Return the index of the last line of the section whose body starts at lines[start]"""
+    end = start
+    while end + 1 < len(lines) and lines[end + 1] and not REPORT_SECTION_START_RE.match(lines[end + 1]):
+        end += 1
+    return end
+
+def find_lab_section(lines):
+    """Return the first lab results header line, from the header on, with the lines of its section"""
+    last = len(lines) - 1
+    for i, line in enumerate(lines):
+        # A header at the very end of the text has nothing under it, so it only counts with text after it
+        header = REPORT_LAB_HEADER_RE.search(line if i < last else line[:-1])
+        if header:
+            end = find_section_end(lines, i + 1) if i < last else i
+            return [line[header.start():]] + lines[i + 1:end + 1]
+    return None
+
+def find_test_result_mentions(lines, limit):
+    """Return up to limit passages starting at a test result verb, each running to the end of its section"""
+    mentions = []
+    last = len(lines) - 1
+    i = 0
+    while i <= last and len(mentions) < limit:
+        line = lines[i]
+        # As with lab headers, a mention on the last line needs at least one character after it
+        head = REPORT_TEST_RESULT_HEAD_RE.search(line if i < last else line[:-1])
+        if not head:
+            i += 1
+            continue
+        # A sentence that ends on this line keeps the section from here, otherwise it starts on the next line
+        start = i if head.end() < len(line) or i == last else i + 1
+        end = find_section_end(lines, start)
+        mentions.append("\n".join([line[head.start():]] + lines[i + 1:end + 1]))
+        i = end + 1
+    return mentions
+
+# Backoff between report analysis retries, in seconds
+GEMINI_RETRY_BASE_DELAY = 0.5
+GEMINI_RETRY_MAX_DELAY = 8
+GEMINI_RETRY_JITTER = 0.25
+
 # Function to analyze medical reports using Gemini API
 def analyze_medical_reports_with_gemini(prompt):
     try:
@@ -1159,43 +1677,23 @@ def analyze_medical_reports_with_gemini(prompt):
             logger.error("Cannot process request: GEMINI_API_KEY not configured")
             return {"error": "API key not configured"}
         
-        genai.configure(api_key=api_key)
-        
-        # Log that we're about to call the API
-        logger.info("Configured Gemini API with API key")
-        
-        # Create model with more specific parameters
-        model = genai.GenerativeModel(
-            model_name="gemini-1.5-pro",
-            generation_config={
-                "temperature": 0.3,  # Lower temperature for more deterministic results
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 8192,  # Increased max tokens for more detailed analysis
-            },
-            safety_settings=safety_settings
-        )
-        
-        logger.info("Sending request to Gemini API...")
+        logger.debug("Sending request to Gemini API...")
         start_time = time.time()
         
-        # Add timeout and retry logic
+        # Retry failed calls with exponential backoff, jittered so concurrent retries spread out
         max_retries = 2
-        retry_count = 0
-        
-        while retry_count <= max_retries:
+        for attempt in range(max_retries + 1):
             try:
-                response = model.generate_content(prompt, stream=False)
+                response = report_analysis_model.generate_content(prompt, stream=False)
                 break  # If successful, break out of the retry loop
             except Exception as e:
-                retry_count += 1
-                logger.warning(f"Gemini API request failed (attempt {retry_count}/{max_retries}): {str(e)}")
-                if retry_count > max_retries:
+                logger.warning("Gemini API request failed (attempt %d/%d): %s", attempt + 1, max_retries + 1, e)
+                if attempt == max_retries:
                     raise  # Re-raise the exception if we've exhausted retries
-                time.sleep(2)  # Wait before retrying
+                time.sleep(min(GEMINI_RETRY_MAX_DELAY, GEMINI_RETRY_BASE_DELAY * 2 ** attempt) + random.uniform(0, GEMINI_RETRY_JITTER))
         
         elapsed_time = time.time() - start_time
-        logger.info(f"Received response from Gemini API in {elapsed_time:.2f} seconds")
+        logger.info("Received response from Gemini API in %.2f seconds", elapsed_time)
         
         try:
             # Check if response contains text
@@ -1204,25 +1702,24 @@ def analyze_medical_reports_with_gemini(prompt):
                 return create_fallback_response("The AI model returned an empty response. Please try again.")
             
             response_text = response.text
-            logger.info(f"Response text length: {len(response_text)} characters")
+            logger.debug("Response text length: %d characters", len(response_text))
             
             # Try to parse as JSON
             try:
                 # First, attempt to extract JSON if wrapped in markdown code blocks
-                json_match = re.search(r'```json\s*([\s\S]*?)\s*```', response_text)
-                if json_match:
-                    logger.info("Found JSON in markdown code block")
-                    json_str = json_match.group(1)
-                    report_analysis = json.loads(json_str)
+                json_str = extract_json_fence(response_text)
+                if json_str is not None:
+                    logger.debug("Found JSON in markdown code block")
+                    report_analysis = orjson.loads(json_str)
                 else:
                     # Try direct JSON parsing
-                    report_analysis = json.loads(response_text)
+                    report_analysis = orjson.loads(response_text)
                 
-                logger.info("Successfully parsed JSON response")
+                logger.debug("Successfully parsed JSON response")
                 
-            except json.JSONDecodeError as json_err:
-                logger.error(f"Failed to parse JSON response: {str(json_err)}")
-                logger.error(f"Response text (first 500 chars): {response_text[:500]}...")
+            except orjson.JSONDecodeError as json_err:
+                logger.error("Failed to parse JSON response: %s", json_err)
+                logger.error("Response text (first 500 chars): %s...", response_text[:500])
                 
                 # Try to extract structured data from non-JSON text
                 logger.info("Attempting to extract structured data from non-JSON response")
@@ -1230,118 +1727,131 @@ def analyze_medical_reports_with_gemini(prompt):
             
             # Add default values for any missing fields
             report_analysis = ensure_complete_response(report_analysis)
-            logger.info("Completed response structure with default values where needed")
+            logger.debug("Completed response structure with default values where needed")
             
             return report_analysis
             
         except Exception as parsing_err:
-            logger.error(f"Error processing Gemini API response: {str(parsing_err)}")
+            logger.error("Error processing Gemini API response: %s", parsing_err)
             logger.error(traceback.format_exc())
             return create_fallback_response(f"Error processing AI response: {str(parsing_err)}")
             
     except Exception as e:
-        logger.error(f"Error calling Gemini API: {str(e)}")
+        logger.error("Error calling Gemini API: %s", e)
         logger.error(traceback.format_exc())
         return create_fallback_response(f"Error calling AI service: {str(e)}")
 
+# Every field of the report fallback response except the error-specific recommendation
+REPORT_FALLBACK_RESPONSE_BASE = {
+    "followUpActions": [
+        "Consult with a healthcare provider to review your medical reports",
+        "Try uploading different report formats (PDF recommended) or clearer images",
+        "Consider providing additional context about your symptoms and reports",
+        "Schedule a follow-up appointment to discuss your test results in detail"
+    ],
+    "riskFactors": [
+        "Unable to determine specific risk factors from the provided reports",
+        "Delayed diagnosis or treatment due to incomplete analysis",
+        "Potential oversight of important medical findings"
+    ],
+    "mealRecommendations": {
+        "breakfast": ["Balanced meal with protein, whole grains, and fruits"],
+        "lunch": ["Varied diet with vegetables, lean protein, and complex carbohydrates"],
+        "dinner": ["Light meal with vegetables, protein, and minimal carbohydrates"],
+        "note": "These are general recommendations. Please consult a nutritionist for personalized advice based on your specific test results."
+    },
+    "exercisePlan": [
+        "Regular moderate physical activity appropriate for your condition",
+        "Consult with a healthcare provider before starting any exercise regimen",
+        "Consider activities that don't exacerbate your symptoms"
+    ],
+    "preventiveMeasures": [
+        "Regular health check-ups with comprehensive blood work",
+        "Follow your doctor's advice regarding diagnostic tests",
+        "Keep a record of all your symptoms and test results",
+        "Maintain a healthy lifestyle with balanced nutrition"
+    ],
+    "dos": [
+        "Maintain a healthy lifestyle with balanced nutrition and regular exercise",
+        "Keep all your medical reports organized and accessible",
+        "Continue taking prescribed medications as directed by your doctor",
+        "Follow up with healthcare providers for proper interpretation of test results"
+    ],
+    "donts": [
+        "Avoid self-medication based on incomplete analysis",
+        "Don't ignore persistent symptoms even if analysis was inconclusive",
+        "Avoid delaying professional medical consultation",
+        "Don't rely solely on automated analysis for medical decisions"
+    ],
+    "ayurvedicMedication": {"recommendations": []},
+    "possibleConditions": [],
+    "healthScore": 5,
+    "keyFindings": [
+        "Your report appears to contain medical data that requires professional interpretation",
+        "The system identified the presence of medical reports but couldn't extract specific values",
+        "For blood test/CBC reports: These typically measure blood cell counts, hemoglobin levels, and other important markers",
+        "For imaging reports: These may contain important structural or functional information relevant to your symptoms",
+        "Professional medical review is recommended to fully interpret these results in context with your symptoms"
+    ],
+    "summary": "We encountered technical difficulties analyzing your specific medical reports. While the system has identified the types of reports you've uploaded, a healthcare professional should review these documents for accurate interpretation. The reports you've provided contain valuable medical information that, when properly analyzed, can help guide your diagnosis and treatment. Please consult with a qualified healthcare provider who can interpret your test results in the context of your medical history and current symptoms."
+}
+
 # Helper function to create a fallback response
 def create_fallback_response(error_message):
-    logger.info(f"Creating fallback response with error: {error_message}")
+    logger.info("Creating fallback response with error: %s", error_message)
     return {
         "recommendation": f"We encountered an issue analyzing your reports. {error_message} Please consult with a healthcare provider for proper medical advice.",
-        "followUpActions": [
-            "Consult with a healthcare provider to review your medical reports",
-            "Try uploading different report formats (PDF recommended) or clearer images",
-            "Consider providing additional context about your symptoms and reports",
-            "Schedule a follow-up appointment to discuss your test results in detail"
-        ],
-        "riskFactors": [
-            "Unable to determine specific risk factors from the provided reports",
-            "Delayed diagnosis or treatment due to incomplete analysis",
-            "Potential oversight of important medical findings"
-        ],
-        "mealRecommendations": {
-            "breakfast": ["Balanced meal with protein, whole grains, and fruits"],
-            "lunch": ["Varied diet with vegetables, lean protein, and complex carbohydrates"],
-            "dinner": ["Light meal with vegetables, protein, and minimal carbohydrates"],
-            "note": "These are general recommendations. Please consult a nutritionist for personalized advice based on your specific test results."
-        },
-        "exercisePlan": [
-            "Regular moderate physical activity appropriate for your condition",
-            "Consult with a healthcare provider before starting any exercise regimen",
-            "Consider activities that don't exacerbate your symptoms"
-        ],
-        "preventiveMeasures": [
-            "Regular health check-ups with comprehensive blood work",
-            "Follow your doctor's advice regarding diagnostic tests",
-            "Keep a record of all your symptoms and test results",
-            "Maintain a healthy lifestyle with balanced nutrition"
-        ],
-        "dos": [
-            "Maintain a healthy lifestyle with balanced nutrition and regular exercise",
-            "Keep all your medical reports organized and accessible",
-            "Continue taking prescribed medications as directed by your doctor",
-            "Follow up with healthcare providers for proper interpretation of test results"
-        ],
-        "donts": [
-            "Avoid self-medication based on incomplete analysis",
-            "Don't ignore persistent symptoms even if analysis was inconclusive",
-            "Avoid delaying professional medical consultation",
-            "Don't rely solely on automated analysis for medical decisions"
-        ],
-        "ayurvedicMedication": {"recommendations": []},
-        "possibleConditions": [],
-        "healthScore": 5,
-        "keyFindings": [
-            "Your report appears to contain medical data that requires professional interpretation",
-            "The system identified the presence of medical reports but couldn't extract specific values",
-            "For blood test/CBC reports: These typically measure blood cell counts, hemoglobin levels, and other important markers",
-            "For imaging reports: These may contain important structural or functional information relevant to your symptoms",
-            "Professional medical review is recommended to fully interpret these results in context with your symptoms"
-        ],
-        "summary": "We encountered technical difficulties analyzing your specific medical reports. While the system has identified the types of reports you've uploaded, a healthcare professional should review these documents for accurate interpretation. The reports you've provided contain valuable medical information that, when properly analyzed, can help guide your diagnosis and treatment. Please consult with a qualified healthcare provider who can interpret your test results in the context of your medical history and current symptoms."
+        **REPORT_FALLBACK_RESPONSE_BASE
     }
 
+# Default values for every report analysis field; responses get copies via copy_default
+REPORT_RESPONSE_DEFAULTS = {
+    "recommendation": "Please consult with a healthcare provider for a proper medical recommendation.",
+    "followUpActions": ["Consult with a healthcare provider"],
+    "riskFactors": ["No specific risk factors identified"],
+    "mealRecommendations": {
+        "breakfast": ["Balanced meal with protein, whole grains, and fruits"],
+        "lunch": ["Varied diet with vegetables, lean protein, and complex carbohydrates"],
+        "dinner": ["Light meal with vegetables, protein, and minimal carbohydrates"],
+        "note": "These are general recommendations. Please consult a nutritionist for personalized advice."
+    },
+    "exercisePlan": ["Moderate physical activity as appropriate"],
+    "preventiveMeasures": ["Regular health check-ups"],
+    "dos": ["Maintain a healthy lifestyle"],
+    "donts": ["Avoid self-medication"],
+    "ayurvedicMedication": {"recommendations": []},
+    "possibleConditions": [],
+    "healthScore": 5,
+    "keyFindings": ["Analysis completed based on provided information"],
+    "summary": "The uploaded reports were analyzed in context with your symptoms. Please consult a healthcare provider for accurate interpretation."
+}
+
+def copy_default(value):
+    """Copy a default's lists and dicts, one level deep, so responses never share them with the module constant"""
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return {key: copy_default(item) if isinstance(item, list) else item for key, item in value.items()}
+    return value
+
 # Helper function to ensure response has all required fields
 def ensure_complete_response(analysis):
-    # Define default values for all fields
-    defaults = {
-        "recommendation": "Please consult with a healthcare provider for a proper medical recommendation.",
-        "followUpActions": ["Consult with a healthcare provider"],
-        "riskFactors": ["No specific risk factors identified"],
-        "mealRecommendations": {
-            "breakfast": ["Balanced meal with protein, whole grains, and fruits"],
-            "lunch": ["Varied diet with vegetables, lean protein, and complex carbohydrates"],
-            "dinner": ["Light meal with vegetables, protein, and minimal carbohydrates"],
-            "note": "These are general recommendations. Please consult a nutritionist for personalized advice."
-        },
-        "exercisePlan": ["Moderate physical activity as appropriate"],
-        "preventiveMeasures": ["Regular health check-ups"],
-        "dos": ["Maintain a healthy lifestyle"],
-        "donts": ["Avoid self-medication"],
-        "ayurvedicMedication": {"recommendations": []},
-        "possibleConditions": [],
-        "healthScore": 5,
-        "keyFindings": ["Analysis completed based on provided information"],
-        "summary": "The uploaded reports were analyzed in context with your symptoms. Please consult a healthcare provider for accurate interpretation."
-    }
+    defaults = REPORT_RESPONSE_DEFAULTS
     
     # Ensure all keys exist
     for key, default_value in defaults.items():
-        if key not in analysis:
-            analysis[key] = default_value
-        elif analysis[key] is None:
-            analysis[key] = default_value
+        if analysis.get(key) is None:
+            analysis[key] = copy_default(default_value)
     
     # Handle nested mealRecommendations structure
     if "mealRecommendations" in analysis:
         if not isinstance(analysis["mealRecommendations"], dict):
-            analysis["mealRecommendations"] = defaults["mealRecommendations"]
+            analysis["mealRecommendations"] = copy_default(defaults["mealRecommendations"])
         else:
             for meal_key in ["breakfast", "lunch", "dinner", "note"]:
                 if meal_key not in analysis["mealRecommendations"] or not analysis["mealRecommendations"][meal_key]:
                     if meal_key in defaults["mealRecommendations"]:
-                        analysis["mealRecommendations"][meal_key] = defaults["mealRecommendations"][meal_key]
+                        analysis["mealRecommendations"][meal_key] = copy_default(defaults["mealRecommendations"][meal_key])
     
     # Ensure ayurvedicMedication has correct structure
     if "ayurvedicMedication" in analysis:
@@ -1354,14 +1864,16 @@ def ensure_complete_response(analysis):
 def extract_structured_data_from_text(text):
     # Initialize the result structure
     result = {}
+    # Split once; the fallback findings below scan sections line by line
+    lines = text.split('\n')
     
     # Try to extract recommendation
-    recommendation_match = re.search(r'(?:Recommendation|RECOMMENDATION)[:\s]+(.*?)(?:\n\n|\n[A-Z]|$)', text, re.DOTALL | re.IGNORECASE)
+    recommendation_match = REPORT_RECOMMENDATION_RE.search(text)
     if recommendation_match:
         result["recommendation"] = recommendation_match.group(1).strip()
     
     # Try to extract health score - look for numbers 1-10
-    health_score_match = re.search(r'(?:Health Score|HEALTH SCORE)[:\s]+(\d+(?:\.\d+)?)', text, re.IGNORECASE)
+    health_score_match = REPORT_HEALTH_SCORE_RE.search(text)
     if health_score_match:
         try:
             score = float(health_score_match.group(1))
@@ -1372,11 +1884,11 @@ def extract_structured_data_from_text(text):
             pass
     
     # Try to extract key findings
-    findings_section = re.search(r'(?:Key Findings|KEY FINDINGS)(?:from Reports)?[:\s]+(.*?)(?:\n\n|\n[A-Z]|$)', text, re.DOTALL | re.IGNORECASE)
+    findings_section = REPORT_FINDINGS_RE.search(text)
     if findings_section:
         findings_text = findings_section.group(1).strip()
         # Split by bullet points, numbers, or new lines
-        findings = re.split(r'(?:\n|•|\*|\d+\.)\s*', findings_text)
+        findings = REPORT_LIST_SPLIT_RE.split(findings_text)
         findings = [f.strip() for f in findings if f.strip()]
         if findings:
             result["keyFindings"] = findings
@@ -1384,23 +1896,22 @@ def extract_structured_data_from_text(text):
     # If no key findings extracted using the pattern above, try broader extraction
     if "keyFindings" not in result or not result["keyFindings"]:
         # Look for CBC or blood test related content
-        cbc_section = re.search(r'(?:CBC|Blood Test|Laboratory|Lab Results?|Hematology|Blood Count)[^\n]*(?:\n|.)+?(?=\n\n|\n[A-Z]|$)', text, re.DOTALL | re.IGNORECASE)
-        if cbc_section:
-            cbc_text = cbc_section.group(0).strip()
+        cbc_lines = find_lab_section(lines)
+        if cbc_lines:
             # Extract key points from this section
-            lines = [line.strip() for line in cbc_text.split('\n') if line.strip()]
+            section_lines = [line.strip() for line in cbc_lines if line.strip()]
             # Filter out lines that are just headers
-            findings = [line for line in lines if len(line) > 10 and not re.match(r'^[A-Z\s]+:$', line)]
+            findings = [line for line in section_lines if len(line) > 10 and not REPORT_HEADER_LINE_RE.match(line)]
             if findings:
                 result["keyFindings"] = findings[:5]  # Limit to 5 findings
     
     # If still no findings, check for any mentions of test results
     if "keyFindings" not in result or not result["keyFindings"]:
-        test_matches = re.findall(r'(?:indicated|showed|revealed|found|identified|detected|present(?:s|ed)?|observed)[^\n.]+(?:\n|.)+?(?=\n\n|\n[A-Z]|$)', text, re.DOTALL | re.IGNORECASE)
+        test_matches = find_test_result_mentions(lines, 3)  # Limit to 3 matches
         if test_matches:
             findings = []
-            for match in test_matches[:3]:  # Limit to 3 matches
-                clean_match = re.sub(r'\s+', ' ', match.strip())
+            for match in test_matches:
+                clean_match = WHITESPACE_RE.sub(' ', match.strip())
                 if len(clean_match) > 10:
                     findings.append(clean_match)
             if findings:
@@ -1409,7 +1920,7 @@ def extract_structured_data_from_text(text):
     # If still no findings, provide a generic finding about the report type
     if "keyFindings" not in result or not result["keyFindings"]:
         # Check if there's any mention of CBC, blood test, or other common tests
-        if re.search(r'CBC|blood test|x-ray|MRI|scan|laboratory|hematology', text, re.IGNORECASE):
+        if REPORT_TEST_MENTION_RE.search(text):
             result["keyFindings"] = [
                 "Medical report identified but specific values could not be extracted",
                 "The report appears to contain medical test results relevant to the patient's condition",
@@ -1417,34 +1928,35 @@ def extract_structured_data_from_text(text):
             ]
     
     # Try to extract summary
-    summary_match = re.search(r'(?:Summary|SUMMARY)[:\s]+(.*?)(?:\n\n|$)', text, re.DOTALL | re.IGNORECASE)
+    summary_match = REPORT_SUMMARY_RE.search(text)
     if summary_match:
         result["summary"] = summary_match.group(1).strip()
     
     # Try to extract follow-up actions
-    followup_section = re.search(r'(?:Follow-up Actions?|FOLLOW-UP ACTIONS?)[:\s]+(.*?)(?:\n\n|\n[A-Z]|$)', text, re.DOTALL | re.IGNORECASE)
+    followup_section = REPORT_FOLLOWUP_RE.search(text)
     if followup_section:
         followup_text = followup_section.group(1).strip()
         # Split by numbers or new lines
-        actions = re.split(r'(?:\n|•|\*|\d+\.)\s*', followup_text)
+        actions = REPORT_LIST_SPLIT_RE.split(followup_text)
         actions = [a.strip() for a in actions if a.strip()]
         if actions:
             result["followUpActions"] = actions
     
     # Try to extract risk factors
-    risk_section = re.search(r'(?:Risk Factors?|RISK FACTORS?)[:\s]+(.*?)(?:\n\n|\n[A-Z]|$)', text, re.DOTALL | re.IGNORECASE)
+    risk_section = REPORT_RISK_FACTORS_RE.search(text)
     if risk_section:
         risk_text = risk_section.group(1).strip()
         # Split by numbers or new lines
-        risks = re.split(r'(?:\n|•|\*|\d+\.)\s*', risk_text)
+        risks = REPORT_LIST_SPLIT_RE.split(risk_text)
         risks = [r.strip() for r in risks if r.strip()]
         if risks:
             result["riskFactors"] = risks
     
     # Return what we could extract, default values will be added later
-    logger.info(f"Extracted {len(result)} fields from non-JSON response")
+    logger.info("Extracted %d fields from non-JSON response", len(result))
     return result
 
 if __name__ == '__main__':
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True) 
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=Config.DEBUG, threaded=True) 
\ No newline at end of file
@@ -1,9 +1,13 @@
 import base64
+import hashlib
 import logging
 import os
+import threading
+import time
 from functools import wraps
 
 import requests
+from cachetools import TTLCache
 from flask import jsonify, request
 from jose import jwt
 from jose.exceptions import JWTError
@@ -25,22 +29,96 @@ if CLERK_SECRET_KEY:
 
 # Cache JWKS for better performance
 _jwks_cache = None
+# PEM-encoded public keys derived from the cached JWKS, keyed by kid
+_pem_by_kid = {}
+_jwks_load_lock = threading.Lock()
+JWKS_REFRESH_INTERVAL = int(os.getenv("CLERK_JWKS_REFRESH_INTERVAL", 600))  # seconds
+JWKS_RETRY_INTERVAL = 30  # seconds between attempts after a failed fetch
+JWKS_REQUEST_TIMEOUT = 5  # seconds
 
-def get_jwks():
-    """Fetch and cache JSON Web Key Set from Clerk"""
-    global _jwks_cache
-    if _jwks_cache is None:
+def jwk_to_pem(key):
+    """Convert an RSA JWK into a PEM-encoded public key"""
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import serialization
+    
+    # Extract the modulus and exponent from the JWKS key
+    n = int.from_bytes(base64.urlsafe_b64decode(key['n'] + '=' * (4 - len(key['n']) % 4)), byteorder='big')
+    e = int.from_bytes(base64.urlsafe_b64decode(key['e'] + '=' * (4 - len(key['e']) % 4)), byteorder='big')
+    
+    # Create RSA public key
+    public_key = rsa.RSAPublicNumbers(e, n).public_key(default_backend())
+    
+    # Export as PEM
+    return public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+def load_jwks():
+    """Fetch the JSON Web Key Set from Clerk and store it with its PEM keys, returning whether it succeeded"""
+    global _jwks_cache, _pem_by_kid
+    try:
+        response = requests.get(CLERK_JWKS_URL, timeout=JWKS_REQUEST_TIMEOUT)
+        response.raise_for_status()
+        jwks = response.json()
+    except Exception as e:
+        logger.error("Failed to fetch JWKS: %s", e)
+        # Keep serving the last good key set; only fall back to no keys if there never was one
+        if _jwks_cache is None:
+            _pem_by_kid = {}
+            _jwks_cache = {"keys": []}
+        return False
+    pem_by_kid = {}
+    for key in jwks.get('keys', []):
         try:
-            response = requests.get(CLERK_JWKS_URL)
-            response.raise_for_status()
-            _jwks_cache = response.json()
+            pem_by_kid[key['kid']] = jwk_to_pem(key)
         except Exception as e:
-            logger.error(f"Failed to fetch JWKS: {str(e)}")
-            _jwks_cache = {"keys": []}
+            logger.error("Error converting JWKS to PEM for kid %s: %s", key.get('kid'), e)
+    _pem_by_kid = pem_by_kid
+    _jwks_cache = jwks
+    return True
+
+def get_jwks():
+    """Return the cached JSON Web Key Set, fetching it if the background refresh has not finished yet"""
+    if _jwks_cache is None:
+        with _jwks_load_lock:
+            if _jwks_cache is None:
+                load_jwks()
     return _jwks_cache
 
+def _refresh_jwks_loop():
+    """Keep the key set fresh so token verification never waits on Clerk"""
+    while True:
+        with _jwks_load_lock:
+            loaded = load_jwks()
+        time.sleep(JWKS_REFRESH_INTERVAL if loaded else JWKS_RETRY_INTERVAL)
+
+jwks_refresh_thread = None
+
+def start_jwks_refresh():
+    """Prefetch the key set and refresh it in the background so key rotations are picked up"""
+    global jwks_refresh_thread
+    if jwks_refresh_thread is None:
+        jwks_refresh_thread = threading.Thread(target=_refresh_jwks_loop, name="jwks-refresh", daemon=True)
+        jwks_refresh_thread.start()
+
+# Payloads of recently verified tokens, keyed by token digest, so repeat requests skip the RSA check
+_token_cache = TTLCache(maxsize=4096, ttl=300)
+_token_cache_lock = threading.Lock()
+TOKEN_CACHE_MIN_LIFETIME = 30  # seconds a token must still be valid for to be cached
+
 def verify_token(token):
     """Verify a JWT token using JWKS keys from Clerk"""
+    cache_key = hashlib.sha256(token.encode()).digest()
+    with _token_cache_lock:
+        payload = _token_cache.get(cache_key)
+    if payload is not None:
+        if payload.get('exp', 0) > time.time():
+            return payload
+        with _token_cache_lock:
+            _token_cache.pop(cache_key, None)
+    
     try:
         # Get token headers without verification
         try:
@@ -57,36 +135,14 @@ def verify_token(token):
             return None
         
         # Find the matching key
-        jwks = get_jwks()
-        key = None
-        for k in jwks.get('keys', []):
-            if k.get('kid') == kid:
-                key = k
-                break
+        get_jwks()
+        pem = _pem_by_kid.get(kid)
         
-        if not key:
-            logger.error(f"No key found for kid: {kid}")
+        if not pem:
+            logger.error("No key found for kid: %s", kid)
             return None
         
-        # Convert JWKS key to PEM format
         try:
-            from cryptography.hazmat.primitives.asymmetric import rsa
-            from cryptography.hazmat.backends import default_backend
-            from cryptography.hazmat.primitives import serialization
-            
-            # Extract the modulus and exponent from the JWKS key
-            n = int.from_bytes(base64.urlsafe_b64decode(key['n'] + '=' * (4 - len(key['n']) % 4)), byteorder='big')
-            e = int.from_bytes(base64.urlsafe_b64decode(key['e'] + '=' * (4 - len(key['e']) % 4)), byteorder='big')
-            
-            # Create RSA public key
-            public_key = rsa.RSAPublicNumbers(e, n).public_key(default_backend())
-            
-            # Export as PEM
-            pem = public_key.public_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PublicFormat.SubjectPublicKeyInfo
-            )
-            
             # Verify and decode the token
             payload = jwt.decode(
                 token,
@@ -97,17 +153,23 @@ def verify_token(token):
                 options={"verify_aud": False}
             )
             
+            # Only cache tokens that will stay valid long enough to be reused
+            exp = payload.get('exp')
+            if isinstance(exp, (int, float)) and exp - time.time() > TOKEN_CACHE_MIN_LIFETIME:
+                with _token_cache_lock:
+                    _token_cache[cache_key] = payload
+            
             return payload
             
         except Exception as e:
-            logger.error(f"Error converting JWKS to PEM: {str(e)}")
+            logger.error("Error decoding token: %s", e)
             return None
             
     except JWTError as e:
-        logger.error(f"Token verification failed: {str(e)}")
+        logger.error("Token verification failed: %s", e)
         return None
     except Exception as e:
-        logger.error(f"Unexpected error during token verification: {str(e)}")
+        logger.error("Unexpected error during token verification: %s", e)
         return None
 
 def get_token_from_header():
@@ -1,16 +1,24 @@
 import os
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+# Load environment variables from the backend directory regardless of CWD
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
 
 class Config:
     # Flask configuration
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here')
     DEBUG = os.getenv('FLASK_ENV', 'development') == 'development'
     
+    # Root log level; raise to WARNING in production to skip per-request INFO records
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    
+    # Write parser traces and raw Gemini responses to debug.log; on by default only in development
+    DEBUG_LOG = os.getenv('DEBUG_LOG', str(DEBUG)).lower() in ('1', 'true', 'yes')
+    
     # Gemini API configuration
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+    # gRPC keeps one long-lived HTTP/2 channel per process that all requests multiplex over
+    GEMINI_TRANSPORT = os.getenv('GEMINI_TRANSPORT', 'grpc')
     
     # CORS configuration
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'https://healthvitals-ai-43006.web.app').split(',')
@@ -21,6 +29,48 @@ class Config:
     RATELIMIT_STRATEGY = "fixed-window"
     RATELIMIT_DEFAULT = "100 per minute"
     
+    # Gemini-backed analyses a single client may have running at once
+    MAX_CONCURRENT_ANALYSES_PER_CLIENT = 3
+    
+    # Anonymous quick analysis allowance per client
+    ANONYMOUS_QUICK_ANALYSIS_LIMIT = 1
+    ANONYMOUS_QUICK_ANALYSIS_WINDOW = 60 * 60 * 24  # seconds
+    ANONYMOUS_QUICK_ANALYSIS_MAX_TRACKED = 100_000  # clients remembered at once
+    
+    # Quick analyses reused for repeated age and symptom descriptions
+    QUICK_ANALYSIS_CACHE_SIZE = int(os.getenv('QUICK_ANALYSIS_CACHE_SIZE', 2048))
+    QUICK_ANALYSIS_CACHE_TTL = int(os.getenv('QUICK_ANALYSIS_CACHE_TTL', 10 * 60))  # seconds
+    
+    # Longest free-text symptom description accepted by the quick analysis endpoints
+    QUICK_ANALYSIS_MAX_SYMPTOMS_LENGTH = 4096
+    
+    # Quick analysis batches
+    QUICK_ANALYSIS_BATCH_LIMIT = 10
+    QUICK_ANALYSIS_BATCH_CONCURRENCY = 16
+    
+    # Parsed Gemini analyses reused for identical patient inputs
+    ANALYSIS_CACHE_SIZE = int(os.getenv('ANALYSIS_CACHE_SIZE', 10_000))
+    ANALYSIS_CACHE_TTL = int(os.getenv('ANALYSIS_CACHE_TTL', 60 * 60))  # seconds
+    
+    # Request size limits
+    MAX_JSON_BODY_BYTES = 64 * 1024
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # report uploads
+    
+    # Response compression
+    COMPRESS_MIMETYPES = ('application/json',)
+    COMPRESS_LEVEL = 6
+    COMPRESS_MIN_SIZE = 500  # bytes; smaller bodies are sent as-is
+    
+    # Where uploaded reports are staged; None uses the system temp dir. A large enough
+    # tmpfs such as /dev/shm avoids disk I/O for files that are read straight back
+    REPORT_UPLOAD_DIR = os.getenv('REPORT_UPLOAD_DIR') or None
+    
+    # Most characters of uploaded PDF text included in a report analysis prompt
+    REPORT_PDF_TEXT_LIMIT = 20_000
+    
+    # Worker processes used for rendering PDFs
+    PDF_PROCESS_POOL_SIZE = int(os.getenv('PDF_PROCESS_POOL_SIZE', min(4, os.cpu_count() or 1)))
+    
     # Security headers
     SECURITY_HEADERS = {
         'X-Content-Type-Options': 'nosniff',
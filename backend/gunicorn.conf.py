@@ -0,0 +1,16 @@
+import os
+
+# Gunicorn settings, loaded automatically when running `gunicorn app:app` from this directory
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Gemini calls spend most of their time waiting on the network, so each worker
+# handles concurrent requests on a thread pool instead of blocking per request
+worker_class = "gthread"
+# Caches and the anonymous quick-analysis limiter live in each worker's memory,
+# so prefer a few workers with many threads over many single-threaded workers
+workers = int(os.environ.get("GUNICORN_WORKERS", "2"))
+threads = int(os.environ.get("GUNICORN_THREADS", "32"))
+
+# Full symptom and report analyses can take longer than the 30 second default
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
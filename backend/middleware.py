@@ -1,30 +1,105 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from functools import wraps
+from werkzeug.exceptions import BadRequest
+import gzip
 import time
-from collections import defaultdict
+import threading
+from collections import OrderedDict, defaultdict, deque
+from cachetools import TTLCache
 from config import Config
 
 # Simple in-memory rate limiting
 class RateLimiter:
-    def __init__(self):
-        self.requests = defaultdict(list)
+    def __init__(self, max_tracked_ips: int = 100_000, sweep_interval: int = 60):
+        # Request times per IP, oldest first, with the least recently active IP first
+        self.requests = OrderedDict()
+        self.max_tracked_ips = max_tracked_ips
+        self.sweep_interval = sweep_interval
+        self.last_sweep = time.time()
+        self.lock = threading.Lock()
+    
+    def _sweep(self, current_time: float, window: int) -> None:
+        """Forget IPs whose requests have all left the window"""
+        for ip, request_times in list(self.requests.items()):
+            if not request_times or current_time - request_times[-1] >= window:
+                del self.requests[ip]
+        self.last_sweep = current_time
     
     def is_rate_limited(self, ip: str, limit: int = 100, window: int = 60) -> bool:
         current_time = time.time()
-        # Clean old requests
-        self.requests[ip] = [req_time for req_time in self.requests[ip] 
-                           if current_time - req_time < window]
-        
-        # Check if rate limit is exceeded
-        if len(self.requests[ip]) >= limit:
-            return True
+        with self.lock:
+            if current_time - self.last_sweep >= self.sweep_interval:
+                self._sweep(current_time, window)
+            
+            request_times = self.requests.get(ip)
+            if request_times is None:
+                # Bound memory by dropping the least recently active IP once the table is full
+                if len(self.requests) >= self.max_tracked_ips:
+                    self.requests.popitem(last=False)
+                request_times = self.requests[ip] = deque()
+            else:
+                self.requests.move_to_end(ip)
+            
+            # Clean old requests from the front; only expired entries are touched
+            while request_times and current_time - request_times[0] >= window:
+                request_times.popleft()
             
-        # Add current request
-        self.requests[ip].append(current_time)
-        return False
+            # Check if rate limit is exceeded
+            if len(request_times) >= limit:
+                return True
+            
+            # Add current request
+            request_times.append(current_time)
+            return False
 
 rate_limiter = RateLimiter()
 
+# Token bucket limiting with a bounded, self-expiring set of tracked keys
+class TokenBucketLimiter:
+    def __init__(self, capacity: int, window: int, maxsize: int = 100_000):
+        # Each key gets `capacity` tokens that refill evenly over `window` seconds
+        self.capacity = capacity
+        self.refill_rate = capacity / window
+        # A bucket left alone for a full window is full again, so it can be evicted
+        self.buckets = TTLCache(maxsize=maxsize, ttl=window)
+        self.lock = threading.Lock()
+    
+    def consume(self, key: str) -> bool:
+        """Take a token for the key, returning False if none are available"""
+        current_time = time.time()
+        with self.lock:
+            tokens, last_refill = self.buckets.get(key, (self.capacity, current_time))
+            tokens = min(self.capacity, tokens + (current_time - last_refill) * self.refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, current_time)
+        return allowed
+
+# Caps how many slow upstream calls a single client can have in flight at once
+class ConcurrencyLimiter:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = defaultdict(int)
+        self.lock = threading.Lock()
+    
+    def acquire(self, key: str) -> bool:
+        """Claim a slot for the key, returning False if all of its slots are in use"""
+        with self.lock:
+            if self.active[key] >= self.limit:
+                return False
+            self.active[key] += 1
+            return True
+    
+    def release(self, key: str) -> None:
+        """Give back a slot, forgetting keys with nothing in flight"""
+        with self.lock:
+            self.active[key] -= 1
+            if self.active[key] <= 0:
+                del self.active[key]
+
+analysis_concurrency_limiter = ConcurrencyLimiter(Config.MAX_CONCURRENT_ANALYSES_PER_CLIENT)
+
 def rate_limit(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -34,12 +109,55 @@ def rate_limit(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def limit_concurrent_analyses(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # Signed-in users are limited per account, everyone else per address
+        user_id = getattr(request, 'user_id', None)
+        key = f"user:{user_id}" if user_id else f"ip:{request.remote_addr}"
+        if not analysis_concurrency_limiter.acquire(key):
+            return jsonify({"error": "Too many analyses in progress"}), 429
+        try:
+            response = current_app.make_response(f(*args, **kwargs))
+        except Exception:
+            analysis_concurrency_limiter.release(key)
+            raise
+        if response.is_streamed:
+            # Keep the slot until the streamed body has been sent
+            response.call_on_close(lambda: analysis_concurrency_limiter.release(key))
+        else:
+            analysis_concurrency_limiter.release(key)
+        return response
+    return decorated_function
+
 def add_security_headers(response):
     """
     Add security headers to the response
     """
-    for header, value in Config.SECURITY_HEADERS.items():
-        response.headers[header] = value
+    response.headers.update(Config.SECURITY_HEADERS)
+    return response
+
+def compress_response(response):
+    """
+    Gzip compressible responses for clients that accept it
+    """
+    if (response.mimetype not in Config.COMPRESS_MIMETYPES
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    # Caches must key on Accept-Encoding whether or not this copy is compressed
+    response.vary.add('Accept-Encoding')
+    if request.accept_encodings.quality('gzip') <= 0:
+        return response
+    
+    body = response.get_data()
+    if len(body) < Config.COMPRESS_MIN_SIZE:
+        return response
+    
+    response.set_data(gzip.compress(body, compresslevel=Config.COMPRESS_LEVEL, mtime=0))
+    response.headers['Content-Encoding'] = 'gzip'
     return response
 
 def validate_request_data(f):
@@ -48,9 +166,20 @@ def validate_request_data(f):
         if not request.is_json:
             return jsonify({"error": "Content-Type must be application/json"}), 400
             
-        data = request.get_json()
+        # Reject oversized bodies before spending any time parsing them
+        if request.content_length and request.content_length > Config.MAX_JSON_BODY_BYTES:
+            return jsonify({"error": "Payload too large"}), 413
+            
+        # Parsed by the app's orjson provider and cached for the route handler
+        try:
+            data = request.get_json()
+        except BadRequest:
+            return jsonify({"error": "Request body is not valid JSON"}), 400
         if not data:
             return jsonify({"error": "No data provided"}), 400
+        # Handlers read fields with data.get, so anything but an object is unusable
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
             
         return f(*args, **kwargs)
     return decorated_function 
\ No newline at end of file
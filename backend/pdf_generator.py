@@ -1,4 +1,5 @@
 import io
+import os
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, ListFlowable, ListItem
@@ -431,4 +432,47 @@ def generate_details_pdf(result):
     # Build the PDF
     doc.build(content)
     buffer.seek(0)
-    return buffer 
\ No newline at end of file
+    return buffer
+
+
+# Generators by report type, used when rendering in a worker process
+PDF_GENERATORS = {
+    "overview": generate_overview_pdf,
+    "details": generate_details_pdf,
+}
+
+
+def render_pdf_bytes(report_type, result):
+    """Render a report and return the raw PDF bytes so the result can cross process boundaries"""
+    return PDF_GENERATORS[report_type](result).getvalue()
+
+
+def extract_pdf_text(path, max_pages=5, max_chars_per_page=1500):
+    """
+    Extract text from the first pages of an uploaded PDF for the report analysis prompt.
+    Runs in the PDF process pool, since PyMuPDF documents must not be used from several threads.
+    Returns the text and a list of (page number, error) pairs for pages that could not be read,
+    so the caller can log them where logging is configured.
+    """
+    import fitz  # PyMuPDF, imported lazily since report text extraction is optional
+    
+    file_name = os.path.basename(path)
+    parts = []
+    page_errors = []
+    doc = fitz.open(path)
+    try:
+        for page_num in range(min(max_pages, doc.page_count)):
+            try:
+                # Plain text mode skips the block/span structures the dict and html modes build
+                page_text = doc[page_num].get_text("text").strip()
+            except Exception as e:
+                # Skip unreadable pages and keep the rest of the document
+                page_errors.append((page_num + 1, str(e)))
+                continue
+            parts.append(f"\nContent from {file_name} (page {page_num+1}):\n")
+            parts.append(page_text[:max_chars_per_page])
+            if len(page_text) > max_chars_per_page:
+                parts.append("\n... (truncated)")
+    finally:
+        doc.close()
+    return "".join(parts), page_errors
@@ -1,13 +1,85 @@
-import json
+import orjson
 import re
 import logging
+import logging.handlers
 from typing import Dict, List, Any, Union
 import os
 import traceback
 import time
+import functools
+import queue
+import atexit
+from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Patterns used on every parsed Gemini response, compiled once at import
+WHITESPACE_RE = re.compile(r'\s+')
+SECTION_RE = re.compile(r'([A-Z\s\']+):[\r\n]+([\s\S]+?)(?=(?:[A-Z\s\']+:)|$)')
+POSSIBLE_CONDITIONS_RE = re.compile(r'POSSIBLE CONDITIONS:(.*?)(?=RECOMMENDATION:|$)', re.DOTALL | re.IGNORECASE)
+NUMBERED_BLOCK_SPLIT_RE = re.compile(r'\n\s*\d+\.')
+CONDITION_INFO_RE = re.compile(r'([^(]+)\s*\(Probability:\s*(\d+)%\)\s*:?\s*(.*?)(?=\n|$)', re.DOTALL)
+NUMBER_PREFIX_RE = re.compile(r'^\d+\.\s*')
+FALLBACK_CONDITION_RE = re.compile(r'(?:^|\n)(?:\d+\.\s*)([^(\r\n]+)(?:\((?:Probability:?\s*)?(\d+)%\))([^:\r\n]*):?(.*?)(?=(?:\n\s*\d+\.)|(?:\n\s*[A-Z][A-Z\s\']*\s*RECOMMENDED\s*ACTIONS)|$)', re.DOTALL)
+SECTION_CONDITION_NAME_RE = re.compile(r'(\w+)(?:\s+\w+)*\s+RECOMMENDED\s+ACTIONS', re.IGNORECASE)
+BREAKFAST_RE = re.compile(r'Breakfast:(.*?)(?=Lunch:|$)', re.DOTALL | re.IGNORECASE)
+LUNCH_RE = re.compile(r'Lunch:(.*?)(?=Dinner:|$)', re.DOTALL | re.IGNORECASE)
+DINNER_RE = re.compile(r'Dinner:(.*?)(?=$)', re.DOTALL | re.IGNORECASE)
+DIET_NOTE_RE = re.compile(r'These meal recommendations are based on your.*diet preference.*\.', re.IGNORECASE)
+FIRST_LINE_RE = re.compile(r'\s*([^\n]+)')
+AYURVEDIC_DESCRIPTION_RE = re.compile(r'- Description:(.*?)(?=- Importance:|$)', re.DOTALL)
+AYURVEDIC_IMPORTANCE_RE = re.compile(r'- Importance:(.*?)(?=- Benefits:|$)', re.DOTALL)
+AYURVEDIC_BENEFITS_RE = re.compile(r'- Benefits:(.*?)(?=\d+\.|$)', re.DOTALL)
+REPORT_NAME_RE = re.compile(r'(?:\d+\.\s*)([^\n\-]+)')
+HEALTH_SCORE_RE = re.compile(r'(\d+)/10')
+SEVERITY_RE = re.compile(r'^(10|[1-9])$')
+NUMBERED_LINE_RE = re.compile(r'^\s*\d+\.', re.MULTILINE)
+NUMBERED_ITEM_BREAK_RE = re.compile(r'(\d+\..*?)(?=\s*\d+\.|$)')
+BULLET_ITEM_RE = re.compile(r'(?:^|\n)\s*[-•]\s*(.*?)(?=(?:\n\s*[-•])|$)', re.DOTALL)
+NUMBERED_ITEM_RE = re.compile(r'(?:^|\n)\s*\d+\.\s*([^\n]+)', re.DOTALL)
+DASH_ITEM_RE = re.compile(r'(?:^|\n)\s*[\-\*]\s*(.*?)(?=(?:\n\s*[\-\*])|$)', re.DOTALL)
+
+# Field labels inside recommended report blocks; each field's content runs until the next label
+FIELD_MARKERS = (
+    r'- Purpose:',
+    r'- Benefits:',
+    r'- Analysis Details:',
+    r'- Preparation Required:',
+    r'- Recommendation Reason:'
+)
+NEXT_FIELD_PATTERN = '|'.join(map(re.escape, FIELD_MARKERS))
+
+@functools.lru_cache(maxsize=512)
+def condition_section_patterns(name):
+    """
+    Compile the recommended actions and preventive measures patterns for a condition name.
+    Returns (actions, alt_actions, preventive, alt_preventive); cached since names repeat across responses.
+    """
+    upper_name, plain_name = re.escape(name.upper()), re.escape(name)
+    names = r'(?:' + upper_name + r'|' + plain_name + r')'
+    flags = re.DOTALL | re.IGNORECASE
+    return (
+        re.compile(names + r'\s*RECOMMENDED\s*ACTIONS:(.*?)(?=' + upper_name + r'\s*PREVENTIVE|' + plain_name + r'\s*PREVENTIVE|\d+\.\s*\w+\s*\(Probability|RECOMMENDATION:|$)', flags),
+        re.compile(names + r'\s*RECOMMENDED\s*ACTIONS:(.*?)(?=\w+\s*PREVENTIVE\s*MEASURES|RECOMMENDATION:|$)', flags),
+        re.compile(names + r'\s*PREVENTIVE\s*MEASURES:(.*?)(?=\d+\.\s*\w+\s*\(Probability|RECOMMENDATION:|$)', flags),
+        re.compile(names + r'\s*PREVENTIVE\s*MEASURES:(.*?)(?=\w+\s*RECOMMENDED\s*ACTIONS|RECOMMENDATION:|$)', flags)
+    )
+
+@functools.lru_cache(maxsize=512)
+def condition_probability_pattern(name):
+    """Compile the pattern finding a condition's numbered entry and probability; cached like condition_section_patterns"""
+    return re.compile(r'(\d+)\.\s*' + re.escape(name) + r'(?:[^\d\n]*)\((?:Probability:?\s*)?(\d+)%\)([^:\n]*)', re.IGNORECASE)
+
+@functools.lru_cache(maxsize=32)
+def field_block_patterns(pattern):
+    """Compile the main, fallback and last resort patterns used by extract_field_from_block"""
+    flags = re.DOTALL | re.IGNORECASE
+    return (
+        re.compile(pattern + r'(.*?)(?=' + NEXT_FIELD_PATTERN + r'|$)', flags),
+        re.compile(pattern + r'(.*?)(?=\n\s*\d+\.|$)', flags),
+        re.compile(pattern + r'(.*)', flags)
+    )
+
 def setup_logging():
     """Configure logging for the application"""
     # Get the absolute path to the current directory
@@ -18,8 +90,9 @@ def setup_logging():
     debug_log_path = os.path.join(current_dir, "debug.log")
     
     # Create handlers
-    file_handler = logging.FileHandler(api_log_path, encoding='utf-8')
-    debug_file_handler = logging.FileHandler(debug_log_path, encoding='utf-8')
+    # delay=True defers opening each file until its first record is written
+    file_handler = logging.FileHandler(api_log_path, encoding='utf-8', delay=True)
+    debug_file_handler = logging.FileHandler(debug_log_path, encoding='utf-8', delay=True)
     stream_handler = logging.StreamHandler()
     
     # Set formatter
@@ -33,15 +106,27 @@ def setup_logging():
     stream_handler.setFormatter(formatter)
     
     # Configure root logger
+    # Request threads only enqueue records; a background listener does the file and console writes
+    log_queue = queue.Queue(-1)
+    queue_listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    queue_listener.start()
+    atexit.register(queue_listener.stop)
+    
     root_logger = logging.getLogger()
-    root_logger.setLevel(logging.INFO)
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(stream_handler)
+    root_logger.setLevel(Config.LOG_LEVEL)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
     
     # Configure debug logger (with more detailed logging)
+    # Large Gemini responses are written by their own background listener, never on a request thread
+    debug_log_queue = queue.Queue(-1)
+    debug_queue_listener = logging.handlers.QueueListener(debug_log_queue, debug_file_handler)
+    debug_queue_listener.start()
+    atexit.register(debug_queue_listener.stop)
+    
     debug_logger = logging.getLogger('debug')
-    debug_logger.setLevel(logging.DEBUG)
-    debug_logger.addHandler(debug_file_handler)
+    # Above DEBUG, log_debug and the debug payload guards skip all of their work
+    debug_logger.setLevel(logging.DEBUG if Config.DEBUG_LOG else logging.WARNING)
+    debug_logger.addHandler(logging.handlers.QueueHandler(debug_log_queue))
     # Ensure debug logger doesn't propagate to root logger
     debug_logger.propagate = False
     
@@ -55,7 +140,7 @@ def clean_text(text: str) -> str:
     # Remove asterisks
     text = text.replace('*', '')
     # Trim extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = WHITESPACE_RE.sub(' ', text).strip()
     return text
 
 def parse_gemini_response(response_text: str) -> Dict:
@@ -63,6 +148,9 @@ def parse_gemini_response(response_text: str) -> Dict:
     Parse the response from Gemini API into a structured format.
     Handles various list formats and ensures comprehensive analysis.
     """
+    # Skip building debug payloads when the debug log is off
+    debug_enabled = is_debug_logging_enabled()
+    
     logging.info("Parsing Gemini response")
     log_debug("Starting to parse Gemini response")
     
@@ -131,66 +219,69 @@ def parse_gemini_response(response_text: str) -> Dict:
     try:
         # Split response into sections by heading patterns first
         sections = {}
-        section_pattern = r'([A-Z\s\']+):[\r\n]+([\s\S]+?)(?=(?:[A-Z\s\']+:)|$)'
-        section_matches = re.finditer(section_pattern, response_text)
+        section_matches = SECTION_RE.finditer(response_text)
         
         for match in section_matches:
             section_name = match.group(1).strip().upper()
             section_content = match.group(2).strip()
             sections[section_name] = section_content
         
-        log_debug(f"Extracted {len(sections)} sections from response", {"section_names": list(sections.keys())})
+        if debug_enabled:
+            log_debug(f"Extracted {len(sections)} sections from response", {"section_names": list(sections.keys())})
         
         # Try a direct approach to extract conditions
         # First identify the POSSIBLE CONDITIONS section
-        possible_conditions_pattern = r'POSSIBLE CONDITIONS:(.*?)(?=RECOMMENDATION:|$)'
-        possible_conditions_match = re.search(possible_conditions_pattern, response_text, re.DOTALL | re.IGNORECASE)
+        possible_conditions_match = POSSIBLE_CONDITIONS_RE.search(response_text)
         
         if possible_conditions_match:
             conditions_text = possible_conditions_match.group(1).strip()
-            logging.info(f"Found conditions section with {len(conditions_text)} characters")
-            log_debug("Found conditions section", {"content_length": len(conditions_text), "first_100_chars": conditions_text[:100]})
+            logging.info("Found conditions section with %d characters", len(conditions_text))
+            if debug_enabled:
+                log_debug("Found conditions section", {"content_length": len(conditions_text), "first_100_chars": conditions_text[:100]})
             
             # Split by numbered conditions (1., 2., 3., etc)
-            condition_blocks = re.split(r'\n\s*\d+\.', conditions_text)
+            condition_blocks = NUMBERED_BLOCK_SPLIT_RE.split(conditions_text)
             
             # Remove first empty block if present
             if condition_blocks and not condition_blocks[0].strip():
                 condition_blocks = condition_blocks[1:]
                 
-            logging.info(f"Found {len(condition_blocks)} condition blocks")
-            log_debug(f"Found {len(condition_blocks)} condition blocks", {"first_block": condition_blocks[0] if condition_blocks else "None"})
+            logging.info("Found %d condition blocks", len(condition_blocks))
+            if debug_enabled:
+                log_debug(f"Found {len(condition_blocks)} condition blocks", {"first_block": condition_blocks[0] if condition_blocks else "None"})
             
             # Process each condition block
             for i, block in enumerate(condition_blocks):
                 if not block.strip():
                     continue
                 
-                log_debug(f"Processing condition block {i+1}", {"block_content": block.strip()})
+                if debug_enabled:
+                    log_debug(f"Processing condition block {i+1}", {"block_content": block.strip()})
                 
                 # Extract condition name and probability
-                condition_info_pattern = r'([^(]+)\s*\(Probability:\s*(\d+)%\)\s*:?\s*(.*?)(?=\n|$)'
-                condition_info_match = re.search(condition_info_pattern, block, re.DOTALL)
+                condition_info_match = CONDITION_INFO_RE.search(block)
                 
                 if condition_info_match:
                     # Get the full name (might include numbering like "1. Tension Headache")
                     full_name = condition_info_match.group(1).strip()
                     
                     # Remove numbering prefix if present (e.g., "1. " or "2. ")
-                    name = re.sub(r'^\d+\.\s*', '', full_name)
+                    name = NUMBER_PREFIX_RE.sub('', full_name)
                     
                     # Log both the original and cleaned name for debugging
-                    log_debug(f"Name extraction: Original '{full_name}' -> Cleaned '{name}'")
+                    if debug_enabled:
+                        log_debug(f"Name extraction: Original '{full_name}' -> Cleaned '{name}'")
                     
                     probability = int(condition_info_match.group(2))
                     description = condition_info_match.group(3).strip()
                     
-                    logging.info(f"Extracted condition: {name} ({probability}%)")
-                    log_debug(f"Extracted condition details", {
-                        "name": name,
-                        "probability": probability,
-                        "description_length": len(description)
-                    })
+                    logging.info("Extracted condition: %s (%s%%)", name, probability)
+                    if debug_enabled:
+                        log_debug(f"Extracted condition details", {
+                            "name": name,
+                            "probability": probability,
+                            "description_length": len(description)
+                        })
                     
                     # Add to results
                     result["possibleConditions"].append({
@@ -206,59 +297,68 @@ def parse_gemini_response(response_text: str) -> Dict:
                         "preventiveMeasures": []
                     }
                     
+                    actions_re, alt_actions_re, preventive_re, alt_preventive_re = condition_section_patterns(name)
+                    
                     # Extract recommended actions for this condition
-                    actions_pattern = r'(?:' + re.escape(name.upper()) + r'|' + re.escape(name) + r')\s*RECOMMENDED\s*ACTIONS:(.*?)(?=' + re.escape(name.upper()) + r'\s*PREVENTIVE|' + re.escape(name) + r'\s*PREVENTIVE|\d+\.\s*\w+\s*\(Probability|RECOMMENDATION:|$)'
-                    actions_match = re.search(actions_pattern, response_text, re.DOTALL | re.IGNORECASE)
+                    actions_match = actions_re.search(response_text)
                     
                     if actions_match:
                         actions_text = actions_match.group(1).strip()
-                        log_debug(f"Found actions text for {name}", {"text_length": len(actions_text), "sample": actions_text[:100]})
+                        if debug_enabled:
+                            log_debug(f"Found actions text for {name}", {"text_length": len(actions_text), "sample": actions_text[:100]})
                         actions = extract_list_items(actions_text)
                         result["conditionSpecificData"][name]["recommendedActions"] = [clean_text(action) for action in actions if action.strip()]
-                        logging.info(f"Found {len(result['conditionSpecificData'][name]['recommendedActions'])} recommended actions for {name}")
-                        log_debug(f"Extracted actions for {name}", {"actions": result["conditionSpecificData"][name]["recommendedActions"]})
+                        logging.info("Found %d recommended actions for %s", len(result['conditionSpecificData'][name]['recommendedActions']), name)
+                        if debug_enabled:
+                            log_debug(f"Extracted actions for {name}", {"actions": result["conditionSpecificData"][name]["recommendedActions"]})
                     else:
-                        log_debug(f"No actions found for {name} using pattern", {"pattern": actions_pattern})
+                        if debug_enabled:
+                            log_debug(f"No actions found for {name} using pattern", {"pattern": actions_re.pattern})
                         
                         # Try an alternative pattern if the first one fails
-                        alt_actions_pattern = r'(?:' + re.escape(name.upper()) + r'|' + re.escape(name) + r')\s*RECOMMENDED\s*ACTIONS:(.*?)(?=\w+\s*PREVENTIVE\s*MEASURES|RECOMMENDATION:|$)'
-                        alt_actions_match = re.search(alt_actions_pattern, response_text, re.DOTALL | re.IGNORECASE)
+                        alt_actions_match = alt_actions_re.search(response_text)
                         
                         if alt_actions_match:
                             actions_text = alt_actions_match.group(1).strip()
-                            log_debug(f"Found actions text using alt pattern for {name}", {"text_length": len(actions_text), "sample": actions_text[:100]})
+                            if debug_enabled:
+                                log_debug(f"Found actions text using alt pattern for {name}", {"text_length": len(actions_text), "sample": actions_text[:100]})
                             actions = extract_list_items(actions_text)
                             result["conditionSpecificData"][name]["recommendedActions"] = [clean_text(action) for action in actions if action.strip()]
-                            logging.info(f"Found {len(result['conditionSpecificData'][name]['recommendedActions'])} recommended actions using alt pattern for {name}")
-                            log_debug(f"Extracted actions using alt pattern for {name}", {"actions": result["conditionSpecificData"][name]["recommendedActions"]})
+                            logging.info("Found %d recommended actions using alt pattern for %s", len(result['conditionSpecificData'][name]['recommendedActions']), name)
+                            if debug_enabled:
+                                log_debug(f"Extracted actions using alt pattern for {name}", {"actions": result["conditionSpecificData"][name]["recommendedActions"]})
                     
                     # Extract preventive measures for this condition
-                    preventive_pattern = r'(?:' + re.escape(name.upper()) + r'|' + re.escape(name) + r')\s*PREVENTIVE\s*MEASURES:(.*?)(?=\d+\.\s*\w+\s*\(Probability|RECOMMENDATION:|$)'
-                    preventive_match = re.search(preventive_pattern, response_text, re.IGNORECASE | re.DOTALL)
+                    preventive_match = preventive_re.search(response_text)
                     
                     if preventive_match:
                         preventive_text = preventive_match.group(1).strip()
-                        log_debug(f"Found preventive measures text for {name}", {"text_length": len(preventive_text), "sample": preventive_text[:100]})
+                        if debug_enabled:
+                            log_debug(f"Found preventive measures text for {name}", {"text_length": len(preventive_text), "sample": preventive_text[:100]})
                         preventives = extract_list_items(preventive_text)
                         result["conditionSpecificData"][name]["preventiveMeasures"] = [clean_text(preventive) for preventive in preventives if preventive.strip()]
-                        logging.info(f"Found {len(result['conditionSpecificData'][name]['preventiveMeasures'])} preventive measures for {name}")
-                        log_debug(f"Extracted preventive measures for {name}", {"measures": result["conditionSpecificData"][name]["preventiveMeasures"]})
+                        logging.info("Found %d preventive measures for %s", len(result['conditionSpecificData'][name]['preventiveMeasures']), name)
+                        if debug_enabled:
+                            log_debug(f"Extracted preventive measures for {name}", {"measures": result["conditionSpecificData"][name]["preventiveMeasures"]})
                     else:
-                        log_debug(f"No preventive measures found for {name} using pattern", {"pattern": preventive_pattern})
+                        if debug_enabled:
+                            log_debug(f"No preventive measures found for {name} using pattern", {"pattern": preventive_re.pattern})
                         
                         # Try an alternative pattern if the first one fails
-                        alt_preventive_pattern = r'(?:' + re.escape(name.upper()) + r'|' + re.escape(name) + r')\s*PREVENTIVE\s*MEASURES:(.*?)(?=\w+\s*RECOMMENDED\s*ACTIONS|RECOMMENDATION:|$)'
-                        alt_preventive_match = re.search(alt_preventive_pattern, response_text, re.IGNORECASE | re.DOTALL)
+                        alt_preventive_match = alt_preventive_re.search(response_text)
                         
                         if alt_preventive_match:
                             preventive_text = alt_preventive_match.group(1).strip()
-                            log_debug(f"Found preventive measures text using alt pattern for {name}", {"text_length": len(preventive_text), "sample": preventive_text[:100]})
+                            if debug_enabled:
+                                log_debug(f"Found preventive measures text using alt pattern for {name}", {"text_length": len(preventive_text), "sample": preventive_text[:100]})
                             preventives = extract_list_items(preventive_text)
                             result["conditionSpecificData"][name]["preventiveMeasures"] = [clean_text(preventive) for preventive in preventives if preventive.strip()]
-                            logging.info(f"Found {len(result['conditionSpecificData'][name]['preventiveMeasures'])} preventive measures using alt pattern for {name}")
-                            log_debug(f"Extracted preventive measures using alt pattern for {name}", {"measures": result["conditionSpecificData"][name]["preventiveMeasures"]})
+                            logging.info("Found %d preventive measures using alt pattern for %s", len(result['conditionSpecificData'][name]['preventiveMeasures']), name)
+                            if debug_enabled:
+                                log_debug(f"Extracted preventive measures using alt pattern for {name}", {"measures": result["conditionSpecificData"][name]["preventiveMeasures"]})
                 else:
-                    log_debug(f"Failed to match condition info for block {i+1}", {"pattern_used": condition_info_pattern})
+                    if debug_enabled:
+                        log_debug(f"Failed to match condition info for block {i+1}", {"pattern_used": CONDITION_INFO_RE.pattern})
         
         # If we didn't find conditions the traditional way, fallback to the old approach
         if not result["possibleConditions"]:
@@ -268,21 +368,23 @@ def parse_gemini_response(response_text: str) -> Dict:
             # Extract possible conditions
             if "POSSIBLE CONDITIONS" in sections:
                 conditions_text = sections["POSSIBLE CONDITIONS"]
-                log_debug("Processing POSSIBLE CONDITIONS section", {"text_length": len(conditions_text)})
+                if debug_enabled:
+                    log_debug("Processing POSSIBLE CONDITIONS section", {"text_length": len(conditions_text)})
                 
                 # Extract each condition with numbered list pattern
-                condition_pattern = r'(?:^|\n)(?:\d+\.\s*)([^(\r\n]+)(?:\((?:Probability:?\s*)?(\d+)%\))([^:\r\n]*):?(.*?)(?=(?:\n\s*\d+\.)|(?:\n\s*[A-Z][A-Z\s\']*\s*RECOMMENDED\s*ACTIONS)|$)'
-                condition_matches = re.findall(condition_pattern, conditions_text, re.DOTALL)
+                condition_matches = FALLBACK_CONDITION_RE.findall(conditions_text)
                 
-                logging.info(f"Found {len(condition_matches)} condition matches")
-                log_debug(f"Found {len(condition_matches)} condition matches using fallback pattern")
+                logging.info("Found %d condition matches", len(condition_matches))
+                if debug_enabled:
+                    log_debug(f"Found {len(condition_matches)} condition matches using fallback pattern")
                 
                 for match in condition_matches:
                     name = match[0].strip()
                     probability = int(match[1])
                     description = (match[2] + ' ' + match[3]).strip()
                     
-                    log_debug(f"Extracted condition using fallback", {"name": name, "probability": probability})
+                    if debug_enabled:
+                        log_debug(f"Extracted condition using fallback", {"name": name, "probability": probability})
                     
                     result["possibleConditions"].append({
                         "name": name,
@@ -302,21 +404,22 @@ def parse_gemini_response(response_text: str) -> Dict:
             log_debug("No conditions found through standard patterns, checking for individual condition sections")
             # Look for condition-specific sections
             for section_name, content in sections.items():
-                match = re.search(r'(\w+)(?:\s+\w+)*\s+RECOMMENDED\s+ACTIONS', section_name, re.IGNORECASE)
+                match = SECTION_CONDITION_NAME_RE.search(section_name)
                 if match:
                     condition_name = match.group(1).strip()
-                    log_debug(f"Found condition section for {condition_name}")
+                    if debug_enabled:
+                        log_debug(f"Found condition section for {condition_name}")
                     
                     # Try to find the corresponding condition in the response
-                    condition_pattern = r'(\d+)\.\s*' + re.escape(condition_name) + r'(?:[^\d\n]*)\((?:Probability:?\s*)?(\d+)%\)([^:\n]*)'
-                    cond_match = re.search(condition_pattern, response_text, re.IGNORECASE)
+                    cond_match = condition_probability_pattern(condition_name).search(response_text)
                     
                     probability = 0
                     description = ""
                     if cond_match:
                         probability = int(cond_match.group(2))
                         description = cond_match.group(3).strip()
-                        log_debug(f"Found probability for {condition_name}", {"probability": probability})
+                        if debug_enabled:
+                            log_debug(f"Found probability for {condition_name}", {"probability": probability})
                     
                     # Add the condition
                     if condition_name not in [c["name"] for c in result["possibleConditions"]]:
@@ -341,7 +444,8 @@ def parse_gemini_response(response_text: str) -> Dict:
         # Extract recommendation
         if "RECOMMENDATION" in sections:
             result["recommendation"] = clean_text(sections["RECOMMENDATION"])
-            log_debug("Extracted recommendation", {"length": len(result["recommendation"])})
+            if debug_enabled:
+                log_debug("Extracted recommendation", {"length": len(result["recommendation"])})
         
         # Extract urgency level
         if "URGENCY LEVEL" in sections:
@@ -352,112 +456,122 @@ def parse_gemini_response(response_text: str) -> Dict:
                 result["urgency"] = "medium"
             else:
                 result["urgency"] = "low"
-            log_debug("Extracted urgency level", {"urgency": result["urgency"]})
+            if debug_enabled:
+                log_debug("Extracted urgency level", {"urgency": result["urgency"]})
         
         # Extract follow-up actions
         if "FOLLOW-UP ACTIONS" in sections:
             result["followUpActions"] = extract_list_items(sections["FOLLOW-UP ACTIONS"])
-            log_debug("Extracted follow-up actions", {"count": len(result["followUpActions"])})
+            if debug_enabled:
+                log_debug("Extracted follow-up actions", {"count": len(result["followUpActions"])})
         
         # Extract risk factors
         if "RISK FACTORS" in sections:
             result["riskFactors"] = extract_list_items(sections["RISK FACTORS"])
-            log_debug("Extracted risk factors", {"count": len(result["riskFactors"])})
+            if debug_enabled:
+                log_debug("Extracted risk factors", {"count": len(result["riskFactors"])})
         
         # Extract meal recommendations
         if "INDIAN MEAL RECOMMENDATIONS" in sections:
             meal_text = sections["INDIAN MEAL RECOMMENDATIONS"]
-            log_debug("Extracting meal recommendations", {"text_length": len(meal_text)})
+            if debug_enabled:
+                log_debug("Extracting meal recommendations", {"text_length": len(meal_text)})
             
             # Try to extract breakfast, lunch, and dinner sections
-            breakfast_pattern = r'Breakfast:(.*?)(?=Lunch:|$)'
-            lunch_pattern = r'Lunch:(.*?)(?=Dinner:|$)'
-            dinner_pattern = r'Dinner:(.*?)(?=$)'
-            
-            breakfast_match = re.search(breakfast_pattern, meal_text, re.DOTALL | re.IGNORECASE)
-            lunch_match = re.search(lunch_pattern, meal_text, re.DOTALL | re.IGNORECASE)
-            dinner_match = re.search(dinner_pattern, meal_text, re.DOTALL | re.IGNORECASE)
+            breakfast_match = BREAKFAST_RE.search(meal_text)
+            lunch_match = LUNCH_RE.search(meal_text)
+            dinner_match = DINNER_RE.search(meal_text)
             
             if breakfast_match:
                 result["mealRecommendations"]["breakfast"] = extract_list_items(breakfast_match.group(1))
-                log_debug("Extracted breakfast meals", {"count": len(result["mealRecommendations"]["breakfast"])})
+                if debug_enabled:
+                    log_debug("Extracted breakfast meals", {"count": len(result["mealRecommendations"]["breakfast"])})
             
             if lunch_match:
                 result["mealRecommendations"]["lunch"] = extract_list_items(lunch_match.group(1))
-                log_debug("Extracted lunch meals", {"count": len(result["mealRecommendations"]["lunch"])})
+                if debug_enabled:
+                    log_debug("Extracted lunch meals", {"count": len(result["mealRecommendations"]["lunch"])})
             
             if dinner_match:
                 result["mealRecommendations"]["dinner"] = extract_list_items(dinner_match.group(1))
-                log_debug("Extracted dinner meals", {"count": len(result["mealRecommendations"]["dinner"])})
+                if debug_enabled:
+                    log_debug("Extracted dinner meals", {"count": len(result["mealRecommendations"]["dinner"])})
             
             # Extract diet note if present
-            diet_note_pattern = r'diet preference'
-            diet_note_match = re.search(rf'These meal recommendations are based on your.*{diet_note_pattern}.*\.', meal_text, re.IGNORECASE)
+            diet_note_match = DIET_NOTE_RE.search(meal_text)
             if diet_note_match:
                 result["mealRecommendations"]["note"] = diet_note_match.group(0)
-                log_debug("Extracted diet note", {"note": result["mealRecommendations"]["note"]})
+                if debug_enabled:
+                    log_debug("Extracted diet note", {"note": result["mealRecommendations"]["note"]})
         
         # Extract exercise plan
         if "EXERCISE PLAN" in sections:
             result["exercisePlan"] = extract_list_items(sections["EXERCISE PLAN"])
-            log_debug("Extracted exercise plan", {"count": len(result["exercisePlan"])})
+            if debug_enabled:
+                log_debug("Extracted exercise plan", {"count": len(result["exercisePlan"])})
         
         # Extract diseases
         if "POSSIBLE DISEASES" in sections:
             result["diseases"] = extract_list_items(sections["POSSIBLE DISEASES"])
-            log_debug("Extracted diseases", {"count": len(result["diseases"])})
+            if debug_enabled:
+                log_debug("Extracted diseases", {"count": len(result["diseases"])})
         
         # Extract preventive measures
         if "PREVENTIVE MEASURES" in sections:
             result["preventiveMeasures"] = extract_list_items(sections["PREVENTIVE MEASURES"])
-            log_debug("Extracted preventive measures", {"count": len(result["preventiveMeasures"])})
+            if debug_enabled:
+                log_debug("Extracted preventive measures", {"count": len(result["preventiveMeasures"])})
         
         # Extract medicine recommendations
         if "MEDICINE RECOMMENDATIONS" in sections:
             result["medicineRecommendations"] = extract_list_items(sections["MEDICINE RECOMMENDATIONS"])
-            log_debug("Extracted medicine recommendations", {"count": len(result["medicineRecommendations"])})
+            if debug_enabled:
+                log_debug("Extracted medicine recommendations", {"count": len(result["medicineRecommendations"])})
         
         # Extract Ayurvedic Medication
         if "AYURVEDIC MEDICATION" in sections:
             ayurvedic_text = sections["AYURVEDIC MEDICATION"]
-            log_debug("Extracting Ayurvedic medication", {"text_length": len(ayurvedic_text)})
+            if debug_enabled:
+                log_debug("Extracting Ayurvedic medication", {"text_length": len(ayurvedic_text)})
             
             # Find all Ayurvedic recommendations (numbered items)
-            ayurvedic_blocks = re.split(r'\n\s*\d+\.', ayurvedic_text)
+            ayurvedic_blocks = NUMBERED_BLOCK_SPLIT_RE.split(ayurvedic_text)
             
             # Remove empty first block if present
             if ayurvedic_blocks and not ayurvedic_blocks[0].strip():
                 ayurvedic_blocks = ayurvedic_blocks[1:]
                 
-            log_debug(f"Found {len(ayurvedic_blocks)} Ayurvedic recommendation blocks")
+            if debug_enabled:
+                log_debug(f"Found {len(ayurvedic_blocks)} Ayurvedic recommendation blocks")
             
             for i, block in enumerate(ayurvedic_blocks):
                 if not block.strip():
                     continue
                 
-                log_debug(f"Processing Ayurvedic recommendation block {i+1}")
+                if debug_enabled:
+                    log_debug(f"Processing Ayurvedic recommendation block {i+1}")
                 
                 # Extract the name (first line of the block)
-                name_match = re.match(r'\s*([^\n]+)', block)
+                name_match = FIRST_LINE_RE.match(block)
                 if not name_match:
                     continue
                 name = name_match.group(1).strip()
                 
                 # Extract description
                 description = ""
-                description_match = re.search(r'- Description:(.*?)(?=- Importance:|$)', block, re.DOTALL)
+                description_match = AYURVEDIC_DESCRIPTION_RE.search(block)
                 if description_match:
                     description = description_match.group(1).strip()
                 
                 # Extract importance
                 importance = ""
-                importance_match = re.search(r'- Importance:(.*?)(?=- Benefits:|$)', block, re.DOTALL)
+                importance_match = AYURVEDIC_IMPORTANCE_RE.search(block)
                 if importance_match:
                     importance = importance_match.group(1).strip()
                 
                 # Extract benefits
                 benefits = ""
-                benefits_match = re.search(r'- Benefits:(.*?)(?=\d+\.|$)', block, re.DOTALL)
+                benefits_match = AYURVEDIC_BENEFITS_RE.search(block)
                 if benefits_match:
                     benefits = benefits_match.group(1).strip()
                 
@@ -469,7 +583,8 @@ def parse_gemini_response(response_text: str) -> Dict:
                         "importance": importance,
                         "benefits": benefits
                     })
-                    log_debug(f"Added Ayurvedic recommendation: {name}")
+                    if debug_enabled:
+                        log_debug(f"Added Ayurvedic recommendation: {name}")
             
             # If we couldn't find any structured recommendations, remove the section
             if not result["ayurvedicMedication"]["recommendations"]:
@@ -479,52 +594,62 @@ def parse_gemini_response(response_text: str) -> Dict:
         # Extract dos
         if "DO'S" in sections:
             result["dos"] = extract_list_items(sections["DO'S"])
-            log_debug("Extracted dos", {"count": len(result["dos"])})
+            if debug_enabled:
+                log_debug("Extracted dos", {"count": len(result["dos"])})
         
         # Extract don'ts
         if "DON'TS" in sections:
             result["donts"] = extract_list_items(sections["DON'TS"])
-            log_debug("Extracted don'ts", {"count": len(result["donts"])})
+            if debug_enabled:
+                log_debug("Extracted don'ts", {"count": len(result["donts"])})
             
         # Extract reports required
         if "REPORTS REQUIRED" in sections:
             reports_text = sections["REPORTS REQUIRED"]
-            log_debug("Extracting reports required", {"text_length": len(reports_text)})
-            log_debug("Reports section content (sample)", {"sample": reports_text[:300]})
+            if debug_enabled:
+                log_debug("Extracting reports required", {"text_length": len(reports_text)})
+            if debug_enabled:
+                log_debug("Reports section content (sample)", {"sample": reports_text[:300]})
             
             # Extract each report with its detailed information
             result["reportsRequired"] = []
             
             # First identify each report block (starting with numbers)
-            report_blocks = re.split(r'\n\s*\d+\.', reports_text)
+            report_blocks = NUMBERED_BLOCK_SPLIT_RE.split(reports_text)
             
             # Remove empty first item if it exists
             if report_blocks and not report_blocks[0].strip():
                 report_blocks = report_blocks[1:]
             
-            log_debug(f"Found {len(report_blocks)} report blocks", {"first_block": report_blocks[0][:200] if report_blocks else "None"})
+            if debug_enabled:
+                log_debug(f"Found {len(report_blocks)} report blocks", {"first_block": report_blocks[0][:200] if report_blocks else "None"})
             
             for i, block in enumerate(report_blocks):
                 if not block.strip():
                     continue
                     
-                log_debug(f"Processing report block {i+1}", {"block_length": len(block), "sample": block[:200]})
+                if debug_enabled:
+                    log_debug(f"Processing report block {i+1}", {"block_length": len(block), "sample": block[:200]})
                 
                 # Extract report name (should be the first line)
-                name_match = re.match(r'\s*([^\n]+)', block)
+                name_match = FIRST_LINE_RE.match(block)
                 if not name_match:
-                    log_debug(f"Failed to extract name for report block {i+1}")
+                    if debug_enabled:
+                        log_debug(f"Failed to extract name for report block {i+1}")
                     continue
                     
                 name = name_match.group(1).strip()
-                log_debug(f"Extracted report name: {name}")
+                if debug_enabled:
+                    log_debug(f"Extracted report name: {name}")
                 
                 # Check if the block contains field markers
                 has_markers = any(marker in block for marker in ["- Purpose:", "- Benefits:", "- Analysis Details:", "- Preparation Required:", "- Recommendation Reason:"])
-                log_debug(f"Block has field markers: {has_markers}")
+                if debug_enabled:
+                    log_debug(f"Block has field markers: {has_markers}")
                 
                 if not has_markers:
-                    log_debug(f"No field markers found in block {i+1} - skipping")
+                    if debug_enabled:
+                        log_debug(f"No field markers found in block {i+1} - skipping")
                     continue
                 
                 # Extract other fields using their markers, preserving multi-line content
@@ -534,18 +659,20 @@ def parse_gemini_response(response_text: str) -> Dict:
                 preparation_required = extract_field_from_block(block, r'- Preparation Required:\s*')
                 recommendation_reason = extract_field_from_block(block, r'- Recommendation Reason:\s*')
                 
-                log_debug(f"Extracted fields for {name}", {
-                    "purpose_length": len(purpose),
-                    "benefits_length": len(benefits),
-                    "analysis_details_length": len(analysis_details),
-                    "preparation_required_length": len(preparation_required),
-                    "recommendation_reason_length": len(recommendation_reason)
-                })
+                if debug_enabled:
+                    log_debug(f"Extracted fields for {name}", {
+                        "purpose_length": len(purpose),
+                        "benefits_length": len(benefits),
+                        "analysis_details_length": len(analysis_details),
+                        "preparation_required_length": len(preparation_required),
+                        "recommendation_reason_length": len(recommendation_reason)
+                    })
                 
                 # At least 3 of the 5 fields should have content to consider this a valid report
                 field_count = sum(1 for field in [purpose, benefits, analysis_details, preparation_required, recommendation_reason] if field)
                 if field_count < 3:
-                    log_debug(f"Insufficient fields found for report {name} (only {field_count}/5) - skipping")
+                    if debug_enabled:
+                        log_debug(f"Insufficient fields found for report {name} (only {field_count}/5) - skipping")
                     continue
                 
                 # Create the report item with preserved multi-line content
@@ -564,23 +691,26 @@ def parse_gemini_response(response_text: str) -> Dict:
                 # If we've found anything beyond just the name, add it
                 if len(report_item) > 1:
                     result["reportsRequired"].append(report_item)
-                    log_debug(f"Added report {name} with {len(report_item)} fields")
+                    if debug_enabled:
+                        log_debug(f"Added report {name} with {len(report_item)} fields")
                 else:
-                    log_debug(f"Skipped report {name} due to insufficient data")
+                    if debug_enabled:
+                        log_debug(f"Skipped report {name} due to insufficient data")
                 
-            log_debug("Extracted reports required", {"count": len(result["reportsRequired"])})
+            if debug_enabled:
+                log_debug("Extracted reports required", {"count": len(result["reportsRequired"])})
             
             # If we didn't find any reports but have the text, do one more attempt to parse them
             if not result["reportsRequired"] and reports_text.strip():
                 log_debug("No reports extracted on first pass, trying alternative approach")
                 
                 # Try looking for each subsection marker directly
-                report_name_pattern = r'(?:\d+\.\s*)([^\n\-]+)'
-                report_names = re.findall(report_name_pattern, reports_text)
+                report_names = REPORT_NAME_RE.findall(reports_text)
                 
                 for name in report_names:
                     name = name.strip()
-                    log_debug(f"Found report candidate: {name}")
+                    if debug_enabled:
+                        log_debug(f"Found report candidate: {name}")
                     
                     # Look for sections after this name
                     name_index = reports_text.find(name)
@@ -627,32 +757,38 @@ def parse_gemini_response(response_text: str) -> Dict:
                     # If we've found anything beyond just the name, add it
                     if len(report_item) > 1:
                         result["reportsRequired"].append(report_item)
-                        log_debug(f"Added report {name} with {len(report_item)} fields using alternative method")
+                        if debug_enabled:
+                            log_debug(f"Added report {name} with {len(report_item)} fields using alternative method")
                 
-                log_debug("Completed alternative report extraction", {"count": len(result["reportsRequired"])})
+                if debug_enabled:
+                    log_debug("Completed alternative report extraction", {"count": len(result["reportsRequired"])})
         
         # Extract health score
         if "HEALTH SCORE" in sections:
             health_score_text = sections["HEALTH SCORE"]
-            log_debug("Extracting health score", {"text": health_score_text})
+            if debug_enabled:
+                log_debug("Extracting health score", {"text": health_score_text})
             
             # Extract numeric score from format like "7/10 - Explanation"
-            score_match = re.search(r'(\d+)/10', health_score_text)
+            score_match = HEALTH_SCORE_RE.search(health_score_text)
             if score_match:
                 result["healthScore"] = int(score_match.group(1))
-                log_debug("Extracted health score", {"score": result["healthScore"]})
+                if debug_enabled:
+                    log_debug("Extracted health score", {"score": result["healthScore"]})
         
-        logging.info(f"Successfully parsed response with {len(result['possibleConditions'])} conditions")
-        log_debug("Final parsed result summary", {
-            "conditions_count": len(result["possibleConditions"]),
-            "urgency": result["urgency"],
-            "total_sections_processed": len(sections)
-        })
+        logging.info("Successfully parsed response with %d conditions", len(result['possibleConditions']))
+        if debug_enabled:
+            log_debug("Final parsed result summary", {
+                "conditions_count": len(result["possibleConditions"]),
+                "urgency": result["urgency"],
+                "total_sections_processed": len(sections)
+            })
         
         return result
     except Exception as e:
-        logging.error(f"Error parsing response: {str(e)}")
-        log_debug("Error parsing response", {"error": str(e), "traceback": traceback.format_exc()})
+        logging.error("Error parsing response: %s", e)
+        if debug_enabled:
+            log_debug("Error parsing response", {"error": str(e), "traceback": traceback.format_exc()})
         
         # Initialize with default values in case of error
         return {
@@ -688,7 +824,11 @@ def parse_gemini_response(response_text: str) -> Dict:
 
 def extract_list_items(text: str) -> List[str]:
     """Extract list items from text, handling various formats"""
-    log_debug("Extracting list items from text", {"text_length": len(text), "first_50_chars": text[:50] if text else ""})
+    # Skip building debug payloads when the debug log is off
+    debug_enabled = is_debug_logging_enabled()
+    
+    if debug_enabled:
+        log_debug("Extracting list items from text", {"text_length": len(text), "first_50_chars": text[:50] if text else ""})
     
     if not text or len(text.strip()) == 0:
         log_debug("Empty text provided for list extraction")
@@ -697,21 +837,21 @@ def extract_list_items(text: str) -> List[str]:
     items = []
     
     # Try to extract numbered items (1. Item)
-    numbered_regex = r'(?:^|\n)\s*\d+\.\s*([^\n]+)'
-    numbered_matches = re.finditer(numbered_regex, text, re.DOTALL)
+    numbered_matches = NUMBERED_ITEM_RE.finditer(text)
     numbered_items = [match.group(1).strip() for match in numbered_matches]
     
     if numbered_items:
-        log_debug(f"Found {len(numbered_items)} numbered items")
+        if debug_enabled:
+            log_debug(f"Found {len(numbered_items)} numbered items")
         items = numbered_items
     else:
         # Try to extract dash items (- Item)
-        dash_regex = r'(?:^|\n)\s*[\-\*]\s*(.*?)(?=(?:\n\s*[\-\*])|$)'
-        dash_matches = re.finditer(dash_regex, text, re.DOTALL)
+        dash_matches = DASH_ITEM_RE.finditer(text)
         dash_items = [match.group(1).strip() for match in dash_matches]
         
         if dash_items:
-            log_debug(f"Found {len(dash_items)} dash items")
+            if debug_enabled:
+                log_debug(f"Found {len(dash_items)} dash items")
             items = dash_items
         else:
             # Fallback to splitting by lines and filtering
@@ -719,7 +859,8 @@ def extract_list_items(text: str) -> List[str]:
             
             # If we have very few lines or lines are very long, use them directly
             if len(lines) < 8 or any(len(line) > 100 for line in lines):
-                log_debug(f"Using line splitting fallback - found {len(lines)} lines")
+                if debug_enabled:
+                    log_debug(f"Using line splitting fallback - found {len(lines)} lines")
                 items = lines
             else:
                 # Try to find patterns within the lines
@@ -734,7 +875,8 @@ def extract_list_items(text: str) -> List[str]:
                         filtered_lines.append(line)
                 
                 if filtered_lines:
-                    log_debug(f"Using filtered lines - found {len(filtered_lines)} valid lines")
+                    if debug_enabled:
+                        log_debug(f"Using filtered lines - found {len(filtered_lines)} valid lines")
                     items = filtered_lines
                 else:
                     log_debug("No items found using any method")
@@ -742,7 +884,8 @@ def extract_list_items(text: str) -> List[str]:
     
     # Clean items
     cleaned_items = [clean_text(item) for item in items if item.strip()]
-    log_debug(f"Extracted and cleaned {len(cleaned_items)} items")
+    if debug_enabled:
+        log_debug(f"Extracted and cleaned {len(cleaned_items)} items")
     
     return cleaned_items
 
@@ -868,12 +1011,13 @@ def validate_symptoms(symptoms: List[Dict[str, Any]]) -> Dict[str, Union[bool, s
         if 'severity' not in symptom:
             return {"valid": False, "message": f"Symptom '{symptom['name']}' missing 'severity' field"}
         
-        # Convert severity to string if it's a number
-        if isinstance(symptom['severity'], (int, float)):
-            symptom['severity'] = str(symptom['severity'])
+        # Check numbers by their string form, without writing back into the caller's data
+        severity = symptom['severity']
+        if isinstance(severity, (int, float)):
+            severity = str(severity)
         
         # Check severity is a valid value (1-10)
-        if not isinstance(symptom['severity'], str) or not re.match(r'^(10|[1-9])$', symptom['severity']):
+        if not isinstance(severity, str) or not SEVERITY_RE.match(severity):
             return {"valid": False, "message": f"Symptom '{symptom['name']}' has invalid severity (must be 1-10)"}
         
         # Check duration is present and valid
@@ -885,24 +1029,29 @@ def validate_symptoms(symptoms: List[Dict[str, Any]]) -> Dict[str, Union[bool, s
     
     return {"valid": True, "message": "Symptoms validated successfully"}
 
+def is_debug_logging_enabled():
+    """Check whether log_debug output is currently being recorded"""
+    return logging.getLogger('debug').isEnabledFor(logging.DEBUG)
+
 def log_debug(message, data=None):
     """Log debug messages with optional structured data to debug.log"""
     debug_logger = logging.getLogger('debug')
+    if not debug_logger.isEnabledFor(logging.DEBUG):
+        return
     
     if data:
         # If data is provided, convert it to a string for logging
         if isinstance(data, (dict, list)):
-            import json
             try:
                 # Compact JSON format for single-line logging (no indentation)
-                data_str = json.dumps(data, separators=(',', ':'), default=str)
-                debug_logger.debug(f"{message} - {data_str}")
+                data_str = orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+                debug_logger.debug("%s - %s", message, data_str)
             except Exception as e:
-                debug_logger.debug(f"{message} - Error serializing data: {str(e)}")
+                debug_logger.debug("%s - Error serializing data: %s", message, e)
         else:
             # Format non-dict/list data on single line
             data_str = str(data).replace('\n', ' ').replace('\r', '')
-            debug_logger.debug(f"{message} - {data_str}")
+            debug_logger.debug("%s - %s", message, data_str)
     else:
         debug_logger.debug(message)
 
@@ -915,10 +1064,12 @@ def log_gemini_response(response_id, response_text):
         response_text: The full text response from Gemini API
     """
     debug_logger = logging.getLogger('debug')
+    if not debug_logger.isEnabledFor(logging.DEBUG):
+        return
     
     # Clean the response text for single-line logging
     # Replace newlines, tabs, and multiple spaces with single spaces
-    clean_text = re.sub(r'\s+', ' ', response_text)
+    clean_text = WHITESPACE_RE.sub(' ', response_text)
     
     # Truncate if extremely long (keeping beginning and end)
     max_length = 2000
@@ -927,46 +1078,40 @@ def log_gemini_response(response_id, response_text):
         clean_text = truncated
         
     # Log with special prefix for easy filtering
-    debug_logger.debug(f"GEMINI_RESPONSE_{response_id}: {clean_text}")
+    debug_logger.debug("GEMINI_RESPONSE_%s: %s", response_id, clean_text)
 
 def extract_field_from_block(block, pattern):
     """
     Extract a specific field from a text block using a regex pattern.
     Enhanced to capture multi-line content between section markers and format as numbered list.
     """
-    log_debug(f"Extracting field with pattern: {pattern}", {"block_sample": block[:min(len(block), 100)]})
+    # Skip building debug payloads when the debug log is off
+    debug_enabled = is_debug_logging_enabled()
     
-    # Try to match the pattern and capture content until another field marker
-    field_markers = [
-        r'- Purpose:',
-        r'- Benefits:',
-        r'- Analysis Details:',
-        r'- Preparation Required:',
-        r'- Recommendation Reason:'
-    ]
+    if debug_enabled:
+        log_debug(f"Extracting field with pattern: {pattern}", {"block_sample": block[:min(len(block), 100)]})
     
-    # Construct a regex that looks for content until the next field marker
-    next_field_pattern = '|'.join(map(re.escape, field_markers))
-    search_pattern = pattern + r'(.*?)(?=' + next_field_pattern + r'|$)'
+    # Main pattern captures content until another field marker
+    main_re, fallback_re, last_resort_re = field_block_patterns(pattern)
     
     # Try to find the match
     try:
-        match = re.search(search_pattern, block, re.DOTALL | re.IGNORECASE)
+        match = main_re.search(block)
         
         if match:
             content = match.group(1).strip()
-            log_debug(f"Found match using main pattern", {"content_length": len(content), "first_50_chars": content[:min(len(content), 50)]})
+            if debug_enabled:
+                log_debug(f"Found match using main pattern", {"content_length": len(content), "first_50_chars": content[:min(len(content), 50)]})
             
             # Format into numbered list if not already numbered
-            if not re.search(r'^\s*\d+\.', content, re.MULTILINE):
+            if not NUMBERED_LINE_RE.search(content):
                 # Split by lines or bullet points
                 lines = []
                 
                 # Check if content contains bullet points
                 if "-" in content or "•" in content:
                     # Split by bullet points
-                    bullet_pattern = r'(?:^|\n)\s*[-•]\s*(.*?)(?=(?:\n\s*[-•])|$)'
-                    bullet_matches = re.finditer(bullet_pattern, content, re.DOTALL)
+                    bullet_matches = BULLET_ITEM_RE.finditer(content)
                     lines = [match.group(1).strip() for match in bullet_matches]
                 
                 # If no bullet points found, split by lines
@@ -982,33 +1127,33 @@ def extract_field_from_block(block, pattern):
                     log_debug("Converted content to numbered format with line breaks")
             else:
                 # Content is already numbered, ensure each number starts on a new line
-                content = re.sub(r'(\d+\..*?)(?=\s*\d+\.|$)', r'\1\n\n', content)
+                content = NUMBERED_ITEM_BREAK_RE.sub(r'\1\n\n', content)
                 content = content.strip()
                 log_debug("Added line breaks to existing numbered content")
             
             return content
     except Exception as e:
-        log_debug(f"Error in main pattern matching: {str(e)}")
+        if debug_enabled:
+            log_debug(f"Error in main pattern matching: {str(e)}")
     
     # Fallback approach: Look for content until a number followed by a period
     try:
-        search_pattern = pattern + r'(.*?)(?=\n\s*\d+\.|$)'
-        match = re.search(search_pattern, block, re.DOTALL | re.IGNORECASE)
+        match = fallback_re.search(block)
         
         if match:
             content = match.group(1).strip()
-            log_debug(f"Found match using fallback pattern", {"content_length": len(content), "first_50_chars": content[:min(len(content), 50)]})
+            if debug_enabled:
+                log_debug(f"Found match using fallback pattern", {"content_length": len(content), "first_50_chars": content[:min(len(content), 50)]})
             
             # Format into numbered list if not already numbered
-            if not re.search(r'^\s*\d+\.', content, re.MULTILINE):
+            if not NUMBERED_LINE_RE.search(content):
                 # Split by lines or bullet points
                 lines = []
                 
                 # Check if content contains bullet points
                 if "-" in content or "•" in content:
                     # Split by bullet points
-                    bullet_pattern = r'(?:^|\n)\s*[-•]\s*(.*?)(?=(?:\n\s*[-•])|$)'
-                    bullet_matches = re.finditer(bullet_pattern, content, re.DOTALL)
+                    bullet_matches = BULLET_ITEM_RE.finditer(content)
                     lines = [match.group(1).strip() for match in bullet_matches]
                 
                 # If no bullet points found, split by lines
@@ -1024,23 +1169,25 @@ def extract_field_from_block(block, pattern):
                     log_debug("Converted content to numbered format with line breaks using fallback approach")
             else:
                 # Content is already numbered, ensure each number starts on a new line
-                content = re.sub(r'(\d+\..*?)(?=\s*\d+\.|$)', r'\1\n\n', content)
+                content = NUMBERED_ITEM_BREAK_RE.sub(r'\1\n\n', content)
                 content = content.strip()
                 log_debug("Added line breaks to existing numbered content in fallback approach")
             
             return content
     except Exception as e:
-        log_debug(f"Error in fallback pattern matching: {str(e)}")
+        if debug_enabled:
+            log_debug(f"Error in fallback pattern matching: {str(e)}")
     
     # Last resort: Just grab anything after the pattern
     try:
-        match = re.search(pattern + r'(.*)', block, re.DOTALL | re.IGNORECASE)
+        match = last_resort_re.search(block)
         if match:
             content = match.group(1).strip()
-            log_debug(f"Found match using last resort pattern", {"content_length": len(content), "first_50_chars": content[:min(len(content), 50)]})
+            if debug_enabled:
+                log_debug(f"Found match using last resort pattern", {"content_length": len(content), "first_50_chars": content[:min(len(content), 50)]})
             
             # Format into numbered list if not already numbered
-            if not re.search(r'^\s*\d+\.', content, re.MULTILINE):
+            if not NUMBERED_LINE_RE.search(content):
                 # Split by lines
                 lines = [line.strip() for line in content.split('\n') if line.strip()]
                 
@@ -1053,13 +1200,14 @@ def extract_field_from_block(block, pattern):
                     log_debug("Converted content to numbered format with line breaks using last resort approach")
             else:
                 # Content is already numbered, ensure each number starts on a new line
-                content = re.sub(r'(\d+\..*?)(?=\s*\d+\.|$)', r'\1\n\n', content)
+                content = NUMBERED_ITEM_BREAK_RE.sub(r'\1\n\n', content)
                 content = content.strip()
                 log_debug("Added line breaks to existing numbered content in last resort approach")
             
             return content
     except Exception as e:
-        log_debug(f"Error in last resort pattern matching: {str(e)}")
+        if debug_enabled:
+            log_debug(f"Error in last resort pattern matching: {str(e)}")
     
     log_debug("No match found for pattern")
     return "" 
\ No newline at end of file